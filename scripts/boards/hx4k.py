@@ -216,3 +216,12 @@ signals = (
     ("UART_RX", "IOL_3A"),
     ("UART_TX", "IOL_3B"),
 )
+
+# package of the ice40, which determines the balls it has
+package = "TQ144"
+
+# KiCad design the tables above were transcribed from, the ice40's reference
+# and the reference of the connector on each side. See kicad.py.
+kicad_source = "vanilla-ice40/vanilla-ice40.kicad_pcb"
+kicad_fpga = "U2"
+kicad_connectors = {"R": "J3"}
@@ -414,3 +414,12 @@ signals = (
     ("UART_RX", "IOR_136"),
     ("UART_TX", "IOR_126"),
 )
+
+# package of the ice40, which determines the balls it has
+package = "CT256"
+
+# KiCad design the tables above were transcribed from, the ice40's reference
+# and the reference of the connector on each side. See kicad.py.
+kicad_source = "vanilla-ice40-8k/vanilla-ice40-8k.kicad_sch"
+kicad_fpga = "U1"
+kicad_connectors = {"L": "J2", "R": "J3"}
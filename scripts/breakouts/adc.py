@@ -0,0 +1,89 @@
+# Dual channel adc breakout. There is no socket on top of the board, so it
+# has to be the last board in a stack.
+passthrough = False
+
+# the adc's channel A and B outputs, DA0-9 and DB0-9, as latched by the 574s
+adc_groups = [
+    (
+        "ADC_X",
+        [
+            "E[0]",
+            "E[4]",
+            "E[1]",
+            "E[5]",
+            "E[2]",
+            "E[6]",
+            "E[7]",
+            "E[3]",
+            "F[4]",
+            "F[0]",
+        ],
+    ),
+    (
+        "ADC_Y",
+        [
+            "F[5]",
+            "F[1]",
+            "F[6]",
+            "F[2]",
+            "F[3]",
+            "F[7]",
+            "L[7]",
+            "L[3]",
+            "L[6]",
+            "L[2]",
+        ],
+    ),
+]
+
+adc_signals = [
+    ("ADC_CLK_TO_ADC", "L[1]"),
+    ("ADC_CLK_TO_FPGA", "L[5]"),
+    ("ADC_RED", "I[0]"),
+    ("ADC_GRN", "L[0]"),
+    ("ADC_BLU", "L[4]"),
+]
+
+breakouts = ((adc_groups, adc_signals),)
+
+# Timing of the adc for the sdc that pins.py generates, in ns. The 74AVC9112
+# buffers ADC_CLK_TO_ADC into the adc, the 574 latches on its outputs and
+# ADC_CLK_TO_FPGA, so the latched samples reach the ice40 a latch clock to
+# output delay after ADC_CLK_TO_FPGA, give or take the difference in the
+# traces from the buffer (see trace_report.py).
+adc_clock_period = 1000 / 65  # the adc samples at up to 65 MHz
+t_co_min = 1.0  # latch clock to output
+t_co_max = 6.5
+board_delay_min = 0.2
+board_delay_max = 0.6
+clock_delay_min = 0.4
+clock_delay_max = 0.7
+
+# Clocks driven into the ice40, as (signal, period).
+clocks = [("ADC_CLK_TO_FPGA", adc_clock_period)]
+
+# The input and output delays of each group and signal, as (direction,
+# clock, min, max, labels) where a clock of None is the core board's CLK.
+delays = [
+    (
+        "input",
+        "ADC_CLK_TO_FPGA",
+        t_co_min + board_delay_min - clock_delay_max,
+        t_co_max + board_delay_max - clock_delay_min,
+        ["ADC_X", "ADC_Y"],
+    ),
+]
+
+# KiCad board, the reference of its plug, and what each group and signal is
+# connected to on the board, for kicad.py to audit the tables against.
+kicad_source = "breakout-adc/breakout-adc.kicad_pcb"
+kicad_plug = "J15"
+kicad_pins = {
+    "ADC_X": "X{}",
+    "ADC_Y": "Y{}",
+    "ADC_CLK_TO_ADC": "CLK_TO_ADC",
+    "ADC_CLK_TO_FPGA": "ADC_CLK_FPGA",
+    "ADC_RED": "R",
+    "ADC_GRN": "G",
+    "ADC_BLU": "B",
+}
@@ -0,0 +1,10 @@
+# Direct passthrough of all signals.
+passthrough = True
+
+breakouts = ()
+
+# KiCad board and the references of its plug and socket, for kicad.py to
+# audit the passthrough against.
+kicad_source = "breakout-passthrough/breakout-passthrough.kicad_pcb"
+kicad_plug = "J1"
+kicad_socket = "J2"
@@ -0,0 +1,18 @@
+# 12 port pmod breakout, one port per peripheral group. There is no socket on
+# top of the board, so it has to be the last board in a stack.
+passthrough = False
+
+pmod_ports = "ABCDEFGHIJKL"
+
+# each port, plus all of the ports as a single array
+pmod_groups = [
+    (f"PMOD_{port}", [f"{port}[{i}]" for i in range(8)]) for port in pmod_ports
+] + [("PMOD", [f"{port}[{i}]" for port in pmod_ports for i in range(8)])]
+
+breakouts = ((pmod_groups, []),)
+
+# The pmod pins are only aliased as arrays, and each pin is independent of
+# the others, so pins that don't reach the core board, e.g. because a board
+# lower in the stack uses them, are left out rather than being an error.
+pin_aliases = False
+optional_pins = True
@@ -0,0 +1,96 @@
+# 16Mbit sram breakout. Unused pins are passed through to the board above,
+# except G[7], which isn't wired to the socket.
+passthrough = True
+blocked_pins = ["G[7]"]
+
+# sram chip, mapped to the peripheral groups
+sram_groups = [
+    (
+        "SRAM_ADDR_BUS",
+        [
+            "C[7]",
+            "C[3]",
+            "C[6]",
+            "C[2]",
+            "C[5]",
+            "A[0]",
+            "A[4]",
+            "A[1]",
+            "A[5]",
+            "B[6]",
+            "B[3]",
+            "B[7]",
+            "C[0]",
+            "C[4]",
+            "C[1]",
+            "G[3]",
+            "G[6]",
+            "G[2]",
+            "G[5]",
+            "G[1]",
+        ],
+    ),
+    (
+        "SRAM_DATA_BUS",
+        [
+            "D[4]",
+            "D[1]",
+            "D[5]",
+            "D[2]",
+            "D[6]",
+            "D[3]",
+            "D[7]",
+            "G[0]",
+            "B[2]",
+            "B[5]",
+            "B[1]",
+            "B[4]",
+            "B[0]",
+            "A[7]",
+            "A[3]",
+            "A[6]",
+        ],
+    ),
+]
+
+sram_signals = [("SRAM_CS_N", "D[0]"), ("SRAM_OE_N", "A[2]"), ("SRAM_WE_N", "G[4]")]
+
+breakouts = ((sram_groups, sram_signals),)
+
+# The IS61WV102416DBLL-10's timing for the sdc, and the delay of the traces
+# between it and the ice40 (see trace_report.py), in ns.
+sram_timing = {
+    "t_aa": 10.0,  # address access time
+    "t_doe": 4.5,  # OE_N access time
+    "t_oha": 2.5,  # data hold after an address change
+    "t_sa": 0.0,  # address setup to the start of a write
+    "t_ha": 0.0,  # address hold after the end of a write
+    "t_sd": 6.0,  # data setup to the end of a write
+    "t_hd": 0.0,  # data hold after the end of a write
+    "board_delay_min": 0.2,
+    "board_delay_max": 0.5,
+}
+
+# The sram as (timing, address and control labels, data labels), from which
+# pins.py works out its delays.
+srams = [
+    (
+        sram_timing,
+        ["SRAM_ADDR_BUS", "SRAM_CS_N", "SRAM_OE_N", "SRAM_WE_N"],
+        ["SRAM_DATA_BUS"],
+    ),
+]
+
+# KiCad board, the references of its plug and socket, and what each group
+# and signal is connected to on the board, for kicad.py to audit the tables
+# against.
+kicad_source = "breakout-sram/breakout-sram.kicad_pcb"
+kicad_plug = "J1"
+kicad_socket = "J2"
+kicad_pins = {
+    "SRAM_ADDR_BUS": "U1:A{}",
+    "SRAM_DATA_BUS": "U1:I/O{}",
+    "SRAM_CS_N": "U1:CS#",
+    "SRAM_OE_N": "U1:OE#",
+    "SRAM_WE_N": "U1:WE#",
+}
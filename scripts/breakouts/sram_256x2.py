@@ -0,0 +1,155 @@
+# Dual 256K x 16 sram breakout. Unused pins are passed through to the board
+# above.
+passthrough = True
+
+sram_256_a_groups = [
+    (
+        "SRAM_256_A_ADDR_BUS",
+        [
+            "A[0]",
+            "A[4]",
+            "A[1]",
+            "A[5]",
+            "A[2]",
+            "B[3]",
+            "B[7]",
+            "C[0]",
+            "C[4]",
+            "C[1]",
+            "D[7]",
+            "D[3]",
+            "D[6]",
+            "D[2]",
+            "D[5]",
+            "C[6]",
+            "C[2]",
+            "C[5]",
+        ],
+    ),
+    (
+        "SRAM_256_A_DATA_BUS",
+        [
+            "A[6]",
+            "A[3]",
+            "A[7]",
+            "B[0]",
+            "B[4]",
+            "B[1]",
+            "B[5]",
+            "B[2]",
+            "D[1]",
+            "D[4]",
+            "D[0]",
+            "C[7]",
+        ],
+    ),
+]
+
+sram_256_a_signals = [
+    ("SRAM_256_A_OE_N", "C[3]"),
+    ("SRAM_256_A_WE_N", "B[6]"),
+]
+
+sram_256_b_groups = [
+    (
+        "SRAM_256_B_ADDR_BUS",
+        [
+            "G[0]",
+            "G[4]",
+            "G[1]",
+            "G[5]",
+            "G[2]",
+            "H[3]",
+            "H[7]",
+            "J[6]",
+            "J[3]",
+            "J[7]",
+            "J[2]",
+            "J[5]",
+            "J[1]",
+            "J[4]",
+            "J[0]",
+            "K[6]",
+            "K[3]",
+            "K[7]",
+        ],
+    ),
+    (
+        "SRAM_256_B_DATA_BUS",
+        [
+            "G[6]",
+            "G[3]",
+            "G[7]",
+            "H[0]",
+            "H[4]",
+            "H[1]",
+            "H[5]",
+            "H[2]",
+            "K[0]",
+            "K[4]",
+            "K[1]",
+            "K[5]",
+        ],
+    ),
+]
+
+sram_256_b_signals = [
+    ("SRAM_256_B_OE_N", "K[2]"),
+    ("SRAM_256_B_WE_N", "H[6]"),
+]
+
+
+breakouts = (
+    (sram_256_a_groups, sram_256_a_signals),
+    (sram_256_b_groups, sram_256_b_signals),
+)
+
+# Both srams are IS61WV25616BLL-10s, whose timing is in ns.
+part_timing = {
+    "t_aa": 10.0,  # address access time
+    "t_doe": 4.5,  # OE_N access time
+    "t_oha": 2.5,  # data hold after an address change
+    "t_sa": 0.0,  # address setup to the start of a write
+    "t_ha": 0.0,  # address hold after the end of a write
+    "t_sd": 6.0,  # data setup to the end of a write
+    "t_hd": 0.0,  # data hold after the end of a write
+}
+
+# The traces to sram b are up to half as long again as those to sram a, so
+# each has its own board delays: the shortest and longest of its groups and
+# signals as measured on the hx4k's R connector by trace_report.py, rounded
+# outwards.
+sram_a_timing = dict(part_timing, board_delay_min=0.25, board_delay_max=0.42)
+sram_b_timing = dict(part_timing, board_delay_min=0.3, board_delay_max=0.62)
+
+# Each sram's timing, address and control labels, and data labels, for
+# pins.py to work out their delays from.
+srams = [
+    (
+        sram_a_timing,
+        ["SRAM_256_A_ADDR_BUS", "SRAM_256_A_OE_N", "SRAM_256_A_WE_N"],
+        ["SRAM_256_A_DATA_BUS"],
+    ),
+    (
+        sram_b_timing,
+        ["SRAM_256_B_ADDR_BUS", "SRAM_256_B_OE_N", "SRAM_256_B_WE_N"],
+        ["SRAM_256_B_DATA_BUS"],
+    ),
+]
+
+# KiCad board, the references of its plug and socket, and what each group
+# and signal is connected to on the board, for kicad.py to audit the tables
+# against.
+kicad_source = "breakout-sram-256x2/breakout-sram-256x2.kicad_pcb"
+kicad_plug = "J1"
+kicad_socket = "J2"
+kicad_pins = {
+    "SRAM_256_A_ADDR_BUS": "U1:A{}",
+    "SRAM_256_A_DATA_BUS": "U1:I/O{}",
+    "SRAM_256_A_OE_N": "U1:OE",
+    "SRAM_256_A_WE_N": "U1:WE",
+    "SRAM_256_B_ADDR_BUS": "U3:A{}",
+    "SRAM_256_B_DATA_BUS": "U3:I/O{}",
+    "SRAM_256_B_OE_N": "U3:OE",
+    "SRAM_256_B_WE_N": "U3:WE",
+}
@@ -0,0 +1,603 @@
+#!/usr/bin/env python3
+
+import argparse
+import collections
+import importlib
+import math
+import mmap
+import os
+import re
+import sys
+
+from dataclasses import dataclass
+
+import pins
+
+# This script reads the KiCad designs in pcb/ and audits the pin tables in
+# boards/ and breakouts/ against them.
+#
+# The .kicad_sch and .kicad_pcb files are large s-expressions. Rather than
+# loading and parsing a whole file, it is memory mapped and scanned for the
+# top level nodes that are actually needed, e.g. footprints. Only those
+# nodes are tokenized and turned into lists, everything else is skipped by
+# matching parens.
+
+PCB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pcb")
+
+# parens and strings, which is all that's needed to skip over a node
+SKIP_RE = re.compile(rb'[()]|"(?:[^"\\]|\\.)*"')
+
+# the head of a node, i.e. the atom following an open paren
+HEAD_RE = re.compile(rb'\s*([^\s()"]+)')
+
+TOKEN_RE = re.compile(rb'[()]|"(?:[^"\\]|\\.)*"|[^\s()"]+')
+
+STRING_ESCAPE_RE = re.compile(r"\\(.)")
+
+
+def decode_token(tok):
+    if tok[:1] == b'"':
+        return STRING_ESCAPE_RE.sub(r"\1", tok[1:-1].decode())
+    return tok.decode()
+
+
+# Parse the node starting at the open paren at pos into nested lists of
+# strings, returning the node and the position following it.
+def parse_node(buf, pos):
+    stack = []
+    node = None
+    for m in TOKEN_RE.finditer(buf, pos):
+        tok = m.group()
+        if tok == b"(":
+            stack.append([])
+        elif tok == b")":
+            node = stack.pop()
+            if not stack:
+                return node, m.end()
+            stack[-1].append(node)
+        else:
+            stack[-1].append(decode_token(tok))
+    raise ValueError("unbalanced s-expression")
+
+
+# Yield the nodes at the given depth, e.g. 1 for the children of the top
+# level kicad_pcb node, whose head is one of heads.
+def iter_nodes(path, heads, depth=1):
+    heads = {h.encode() for h in heads}
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            level = 0
+            pos = 0
+            while True:
+                m = SKIP_RE.search(buf, pos)
+                if not m:
+                    return
+                pos = m.end()
+
+                tok = m.group()
+                if tok == b"(":
+                    if level == depth:
+                        head = HEAD_RE.match(buf, pos)
+                        if head and head.group(1) in heads:
+                            node, pos = parse_node(buf, m.start())
+                            yield node
+                            continue
+                    level += 1
+                elif tok == b")":
+                    level -= 1
+
+
+def children(node, head):
+    return [c for c in node if isinstance(c, list) and c and c[0] == head]
+
+
+def child(node, head):
+    for c in node:
+        if isinstance(c, list) and c and c[0] == head:
+            return c
+    return None
+
+
+def value(node, head, default=None):
+    c = child(node, head)
+    return c[1] if c and len(c) > 1 else default
+
+
+def property_value(node, name):
+    for c in children(node, "property"):
+        if c[1] == name:
+            return c[2]
+    return None
+
+
+def at(node):
+    c = child(node, "at")
+    x, y = float(c[1]), float(c[2])
+    angle = float(c[3]) if len(c) > 3 else 0.0
+    return x, y, angle
+
+
+# Rotate a point in KiCad's y down coordinates by angle degrees, counter
+# clockwise as displayed.
+def rotate(x, y, angle):
+    if not angle:
+        return x, y
+    a = math.radians(angle)
+    return (
+        x * math.cos(a) + y * math.sin(a),
+        -x * math.sin(a) + y * math.cos(a),
+    )
+
+
+# A pin of a component: its number (the pad or ball, e.g. 21 or J3), its
+# function or name (e.g. IOL_14A), the net it is on and where it is.
+@dataclass
+class Pin:
+    number: str
+    function: str
+    net: str
+    x: float
+    y: float
+
+
+# components, by reference, of pins by number. The value of each component,
+# e.g. its part number, is recorded in values if given.
+def read_pcb(path, values=None):
+    components = {}
+    for fp in iter_nodes(path, ["footprint"]):
+        ref = property_value(fp, "Reference")
+        if ref is None:
+            ref = next(
+                (c[2] for c in children(fp, "fp_text") if c[1] == "reference"), None
+            )
+        if values is not None:
+            values[ref] = property_value(fp, "Value")
+
+        fx, fy, fangle = at(fp)
+        pads = components.setdefault(ref, {})
+        for pad in children(fp, "pad"):
+            net = child(pad, "net")
+            px, py, _ = at(pad)
+            px, py = rotate(px, py, fangle)
+            pads[pad[1]] = Pin(
+                pad[1],
+                value(pad, "pinfunction", ""),
+                net[2] if net else None,
+                fx + px,
+                fy + py,
+            )
+    return components
+
+
+# The copper routed for a net: the length of its tracks, in mm, and how many
+# vias it has.
+@dataclass
+class Route:
+    length: float = 0.0
+    vias: int = 0
+
+
+def node_point(node, head):
+    c = child(node, head)
+    return float(c[1]), float(c[2])
+
+
+# length of the circular arc from start through mid to end
+def arc_length(start, mid, end):
+    (ax, ay), (bx, by), (cx, cy) = start, mid, end
+    d = 2 * (ax * (by - cy) + bx * (cy - ay) + cx * (ay - by))
+    if abs(d) < 1e-12:
+        return math.dist(start, end)
+
+    a2, b2, c2 = ax * ax + ay * ay, bx * bx + by * by, cx * cx + cy * cy
+    ux = (a2 * (by - cy) + b2 * (cy - ay) + c2 * (ay - by)) / d
+    uy = (a2 * (cx - bx) + b2 * (ax - cx) + c2 * (bx - ax)) / d
+    r = math.dist((ux, uy), start)
+
+    # the angle swept from start to end, on the side that mid is on
+    a0 = math.atan2(ay - uy, ax - ux)
+    a1 = math.atan2(by - uy, bx - ux) - a0
+    a2 = math.atan2(cy - uy, cx - ux) - a0
+    a1 %= 2 * math.pi
+    a2 %= 2 * math.pi
+    sweep = a2 if a1 <= a2 else 2 * math.pi - a2
+    return r * sweep
+
+
+# Routes of a layout by net name, and the thickness of the board, which is
+# the most length a via can add to a route.
+def read_routes(path):
+    net_names = {}
+    routes = collections.defaultdict(Route)
+    thickness = 0.0
+    for node in iter_nodes(path, ["general", "net", "segment", "arc", "via"]):
+        head = node[0]
+        if head == "general":
+            thickness = float(value(node, "thickness", "0"))
+        elif head == "net":
+            net_names[node[1]] = node[2]
+        else:
+            # older layouts refer to nets by number, newer ones by name
+            net = value(node, "net")
+            route = routes[net_names.get(net, net)]
+            if head == "via":
+                route.vias += 1
+            elif head == "arc":
+                route.length += arc_length(
+                    node_point(node, "start"),
+                    node_point(node, "mid"),
+                    node_point(node, "end"),
+                )
+            else:
+                route.length += math.dist(
+                    node_point(node, "start"), node_point(node, "end")
+                )
+    return dict(routes), thickness
+
+
+# Schematic coordinates are in mm with 1/10000 mm resolution.
+def point(x, y):
+    return round(x * 10000), round(y * 10000)
+
+
+# Lib symbol pins, by lib id and unit, as (number, name, x, y). Unit 0 pins
+# are common to all units. Power symbols are recorded in power_symbols.
+def read_lib_symbols(node, power_symbols):
+    lib_pins = collections.defaultdict(list)
+    for sym in children(node, "symbol"):
+        lib_id = sym[1]
+        if child(sym, "power") is not None:
+            power_symbols.add(lib_id)
+
+        for unit_sym in children(sym, "symbol"):
+            unit = int(unit_sym[1].rsplit("_", 2)[1])
+            for pin in children(unit_sym, "pin"):
+                x, y, _ = at(pin)
+                lib_pins[lib_id, unit].append(
+                    (value(pin, "number"), value(pin, "name"), x, y)
+                )
+    return lib_pins
+
+
+def symbol_pin_position(sym, x, y):
+    sx, sy, angle = at(sym)
+
+    # lib symbols are y up, schematics are y down
+    x, y = rotate(x, -y, angle)
+    mirror = value(sym, "mirror")
+    if mirror == "x":
+        y = -y
+    elif mirror == "y":
+        x = -x
+    return sx + x, sy + y
+
+
+class UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, p):
+        parent = self.parent.setdefault(p, p)
+        if parent != p:
+            parent = self.parent[p] = self.find(parent)
+        return parent
+
+    def union(self, a, b):
+        self.parent[self.find(a)] = self.find(b)
+
+
+# Components of a schematic, in the same form as read_pcb, including those
+# on its sub-sheets. Nets are worked out from the wires, junctions and labels
+# on each sheet and are named by their label, or power symbol, if they have
+# one. Only the nets on the top sheet are joined up with labels, sub-sheet
+# pins are on the sub-sheet's local nets.
+def read_schematic(path, values=None):
+    power_symbols = set()
+    lib_pins = {}
+    symbols = []
+    wires = []
+    labels = []
+    junctions = []
+    sheets = []
+
+    node_types = [
+        "lib_symbols",
+        "symbol",
+        "wire",
+        "junction",
+        "label",
+        "global_label",
+        "hierarchical_label",
+        "sheet",
+    ]
+    for node in iter_nodes(path, node_types):
+        head = node[0]
+        if head == "lib_symbols":
+            lib_pins = read_lib_symbols(node, power_symbols)
+        elif head == "symbol":
+            symbols.append(node)
+        elif head == "wire":
+            pts = child(node, "pts")
+            wires.append(tuple(point(float(p[1]), float(p[2])) for p in pts[1:3]))
+        elif head == "junction":
+            x, y, _ = at(node)
+            junctions.append(point(x, y))
+        elif head == "sheet":
+            sheets.append(property_value(node, "Sheetfile"))
+        else:
+            x, y, _ = at(node)
+            labels.append((node[1], point(x, y)))
+
+    nets = UnionFind()
+
+    # index the orthogonal wires so points can be checked against them
+    vertical = collections.defaultdict(list)
+    horizontal = collections.defaultdict(list)
+    for a, b in wires:
+        nets.union(a, b)
+        if a[0] == b[0]:
+            vertical[a[0]].append((min(a[1], b[1]), max(a[1], b[1]), a))
+        elif a[1] == b[1]:
+            horizontal[a[1]].append((min(a[0], b[0]), max(a[0], b[0]), a))
+
+    def connect(p):
+        for lo, hi, w in vertical.get(p[0], ()):
+            if lo <= p[1] <= hi:
+                nets.union(p, w)
+        for lo, hi, w in horizontal.get(p[1], ()):
+            if lo <= p[0] <= hi:
+                nets.union(p, w)
+
+    for a, b in wires:
+        connect(a)
+        connect(b)
+    for p in junctions:
+        connect(p)
+
+    # pins of each symbol unit, and power symbols as net names
+    placed = []
+    for sym in symbols:
+        lib_id = value(sym, "lib_id")
+        unit = int(value(sym, "unit", "1"))
+        for number, name, x, y in lib_pins.get((lib_id, 0), []) + lib_pins.get(
+            (lib_id, unit), []
+        ):
+            p = point(*symbol_pin_position(sym, x, y))
+            connect(p)
+            if lib_id in power_symbols:
+                labels.append((property_value(sym, "Value"), p))
+            else:
+                placed.append((property_value(sym, "Reference"), number, name, p))
+        if values is not None and lib_id not in power_symbols:
+            values.setdefault(
+                property_value(sym, "Reference"), property_value(sym, "Value")
+            )
+
+    names = {}
+    for name, p in labels:
+        connect(p)
+        names.setdefault(name, p)
+        nets.union(p, names[name])
+
+    net_names = {}
+    for name, p in sorted(labels):
+        net_names.setdefault(nets.find(p), name)
+
+    components = {}
+    for ref, number, name, p in placed:
+        root = nets.find(p)
+        net = net_names.get(root, f"Net-({ref}-Pad{number})")
+        components.setdefault(ref, {})[number] = Pin(
+            number, name, net, p[0] / 10000, p[1] / 10000
+        )
+
+    # units of a component can be spread over several sheets
+    for sheet in sheets:
+        sub_components = read_schematic(
+            os.path.join(os.path.dirname(path), sheet), values
+        )
+        for ref, sub_pins in sub_components.items():
+            component = components.setdefault(ref, {})
+            for number, pin in sub_pins.items():
+                component.setdefault(number, pin)
+    return components
+
+
+def read_design(path, values=None):
+    if path.endswith(".kicad_sch"):
+        return read_schematic(path, values)
+    return read_pcb(path, values)
+
+
+# KiCad prefixes local net names with the sheet path, e.g. /IOL_2A
+def net_name(net):
+    return net.rsplit("/", 1)[-1] if net else net
+
+
+# The ice40 symbols name pins with their special function too, e.g.
+# IOL_14A_GBIN6 for IOL_14A.
+def logical_pin_name(function):
+    return re.sub(r"_GBIN\d+$", "", function)
+
+
+# The pin map of a core board as drawn in KiCad: for each side, connector
+# pin to (logical pin, ball) of the ice40 pin it is wired to. Also returns
+# the ice40's logical pin to ball map.
+def core_board_pin_map(board):
+    components = read_design(os.path.join(PCB_DIR, board.kicad_source))
+    fpga = components[board.kicad_fpga]
+
+    net_to_fpga = {}
+    logical_pin_to_phys = {}
+    for pin in fpga.values():
+        logical = logical_pin_name(pin.function)
+        logical_pin_to_phys[logical] = pin.number
+        if logical.startswith("IO"):
+            net_to_fpga[pin.net] = (logical, pin.number)
+        elif pin.net:
+            # config pins, e.g. CRESET_B, may be listed by their net, CRESET#
+            logical_pin_to_phys.setdefault(net_name(pin.net), pin.number)
+
+    sides = {}
+    for side, ref in board.kicad_connectors.items():
+        sides[side] = {
+            int(pin.number): net_to_fpga[pin.net]
+            for pin in components[ref].values()
+            if pin.net in net_to_fpga
+        }
+    return sides, logical_pin_to_phys
+
+
+def audit_core_board(board_name):
+    board = importlib.import_module(f"boards.{board_name}")
+    sides, logical_pin_to_phys = core_board_pin_map(board)
+
+    problems = []
+    for logical, ball in board.logical_pin_to_phys.items():
+        kicad_ball = logical_pin_to_phys.get(logical)
+        if kicad_ball != ball:
+            problems.append(f"{logical} is on {ball}, KiCad has {kicad_ball}")
+
+    io_dicts = {"L": board.left_pin_to_logical, "R": board.right_pin_to_logical}
+    for side, kicad_pins in sides.items():
+        io_dict = io_dicts[side] or {}
+        for pin in range(1, pins.B2B_PINS + 1):
+            logical = io_dict.get(pin)
+            kicad_logical = kicad_pins.get(pin, (None, None))[0]
+            if logical != kicad_logical:
+                problems.append(
+                    f"{side} connector pin {pin} is {logical}, KiCad has "
+                    f"{kicad_logical}"
+                )
+
+    for signal, logical in board.signals:
+        if logical not in logical_pin_to_phys:
+            problems.append(f"{signal} is on {logical}, which KiCad doesn't have")
+    return problems
+
+
+# What a breakout's group or signal pin should be connected to on its board:
+# either "REF:function" for a pin of a component, or a net name. Bus
+# patterns are formatted with the bit number.
+def expected_connection(components, spec, net):
+    if ":" in spec:
+        ref, function = spec.split(":", 1)
+        return any(
+            p.function == function and p.net == net
+            for p in components.get(ref, {}).values()
+        )
+    return net_name(net) == spec
+
+
+def describe_net(components, net, skip_ref):
+    connected = [
+        f"{ref}:{p.function or p.number}"
+        for ref, comp in sorted(components.items())
+        if ref != skip_ref
+        for p in comp.values()
+        if p.net == net
+    ]
+    return ", ".join([net_name(net)] + connected)
+
+
+def audit_breakout(name):
+    module = importlib.import_module(pins.breakout_modules[name])
+    components = read_design(os.path.join(PCB_DIR, module.kicad_source))
+    plug = components[module.kicad_plug]
+
+    problems = []
+
+    def check(label, base_pin, spec):
+        pin = plug.get(str(pins.base_pin_numbers[base_pin]))
+        net = pin.net if pin else None
+        if not expected_connection(components, spec, net):
+            problems.append(
+                f"{label} is on {base_pin}, which KiCad connects to "
+                f"{describe_net(components, net, module.kicad_plug)}"
+            )
+
+    for groups, signals in module.breakouts:
+        for label, grp in groups:
+            spec = module.kicad_pins.get(label)
+            if spec:
+                for i, base_pin in enumerate(grp):
+                    check(f"{label}[{i}]", base_pin, spec.format(i))
+        for label, base_pin in signals:
+            spec = module.kicad_pins.get(label)
+            if spec:
+                check(label, base_pin, spec)
+
+    # every plug pin that pins.py passes through to the board above has to
+    # be on the same net as the socket pin above it, its pin +/-60
+    if module.passthrough:
+        socket = components[module.kicad_socket]
+        permutation = pins.board_permutation(name)
+        for pin in range(1, pins.B2B_PINS + 1):
+            if permutation[pin] is None:
+                continue
+            socket_pin = pins.b2b_pin_to_pin(pin)
+            plug_net = plug[str(pin)].net if str(pin) in plug else None
+            socket_net = (
+                socket[str(socket_pin)].net if str(socket_pin) in socket else None
+            )
+            if plug_net is None or plug_net != socket_net:
+                problems.append(
+                    f"plug pin {pin} is passed through to socket pin {socket_pin}, "
+                    f"but KiCad connects them to {net_name(plug_net)} and "
+                    f"{net_name(socket_net)}"
+                )
+    return problems
+
+
+def audit(board_names, breakout_names):
+    ok = True
+    for kind, names, audit_fn in (
+        ("board", board_names, audit_core_board),
+        ("breakout", breakout_names, audit_breakout),
+    ):
+        for name in names:
+            problems = audit_fn(name)
+            if problems:
+                print(f"{kind} {name}: {len(problems)} problems")
+            else:
+                print(f"{kind} {name}: ok")
+            for problem in problems:
+                print(f"  {problem}")
+            ok = ok and not problems
+    return ok
+
+
+def audited_breakouts():
+    return [
+        name
+        for name, module_name in pins.breakout_modules.items()
+        if hasattr(importlib.import_module(module_name), "kicad_source")
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Audit the pin tables against the KiCad designs."
+    )
+    parser.add_argument(
+        "names",
+        nargs="*",
+        help="core boards and breakouts to audit (default: all of them)",
+    )
+    args = parser.parse_args()
+
+    breakouts = audited_breakouts()
+    names = args.names or list(pins.boards) + breakouts
+    for name in names:
+        if name not in pins.boards and name not in breakouts:
+            parser.error(f"nothing to audit for '{name}'")
+
+    ok = audit(
+        [n for n in names if n in pins.boards],
+        [n for n in names if n in breakouts],
+    )
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+
+import argparse
+import concurrent.futures
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+import pins
+
+# This script places and routes a design with nextpnr-ice40 for several
+# constraint variants, e.g. the same design on different boards or stacks,
+# or with an alternative bit order, with several seeds each, and reports the
+# Fmax and utilization of each variant in one table.
+#
+# The design is synthesized once with yosys. Each variant's pcf is then
+# generated by pins.py for just the design's ports, and nextpnr is run for
+# every variant and seed in parallel. Results vary from seed to seed, so the
+# Fmax of each clock is given as the min, median and max over the seeds.
+#
+# yosys and nextpnr-ice40 are provided by the flake's dev shell.
+
+DEFAULT_SEEDS = 3
+
+# the nextpnr-ice40 device of each package
+PACKAGE_DEVICES = {"CT256": "--hx8k", "TQ144": "--hx4k"}
+
+# bels reported in the utilization columns
+UTILIZATION_BELS = (
+    ("ICESTORM_LC", "LCs"),
+    ("ICESTORM_RAM", "RAM"),
+    ("SB_IO", "IO"),
+    ("SB_GB", "GB"),
+)
+
+
+# A variant as a board with the stacks fitted to its sides, e.g. hx8k,
+# hx8k:R=sram or hx8k:L=adc:R=sram-256x2,pmod.
+def parse_variant(spec):
+    board, *fitted = spec.split(":")
+    if board not in pins.boards:
+        raise ValueError(f"unknown board '{board}'")
+
+    stacks = {}
+    for arg in fitted:
+        side, sep, stack = arg.partition("=")
+        if not sep or side not in pins.SIDES:
+            raise ValueError(f"'{arg}' isn't SIDE=STACK, e.g. R=sram,pmod")
+        if side not in pins.board_sides(pins.boards[board]):
+            raise ValueError(f"{board} has no {side} connector")
+        stacks[side] = pins.parse_stack(stack)
+        pins.check_stack(stacks[side])
+
+    sides = pins.board_sides(pins.boards[board])
+    return pins.Variant(board, sides, tuple(stacks.get(s, ()) for s in sides))
+
+
+# A variant given as an existing pcf, e.g. one generated with an
+# alternative bit order, as NAME=BOARD:PATH.
+def parse_pcf_variant(spec):
+    name, sep, rest = spec.partition("=")
+    board, sep2, path = rest.partition(":")
+    if not sep or not sep2 or not name:
+        raise ValueError(f"'{spec}' isn't NAME=BOARD:PCF")
+    if board not in pins.boards:
+        raise ValueError(f"unknown board '{board}'")
+    return name, board, path
+
+
+def synthesize(sources, top, work_dir):
+    netlist = os.path.join(work_dir, "design.json")
+    log = os.path.join(work_dir, "yosys.log")
+    script = f"synth_ice40 -top {top} -json {netlist}"
+    with open(log, "w") as f:
+        result = subprocess.run(
+            ["yosys", "-p", script] + sources, stdout=f, stderr=subprocess.STDOUT
+        )
+    if result.returncode:
+        raise ValueError(f"yosys failed, see {log}")
+    return netlist
+
+
+# Write the pcf for each variant, limited to the design's ports, returning
+# (name, board, pcf path) for those that constrain every port and the
+# problem with each of the others.
+def write_pcfs(variants, pcf_variants, ports, work_dir):
+    pcfs = []
+    problems = []
+    for variant in variants:
+        try:
+            text = pins.pcf_text(variant, pins.default_cache_dir(), ports)
+        except ValueError as e:
+            problems.append(f"{variant.name}: {e}")
+            continue
+        path = os.path.join(work_dir, f"{variant.name}.pcf")
+        pins.atomic_write(path, [text])
+        pcfs.append((variant.name, variant.board, path))
+
+    for name, board, source in pcf_variants:
+        try:
+            with open(source) as f:
+                sections = pins.prune_sections(pins.parse_pcf(f.read()), ports)
+        except (OSError, ValueError) as e:
+            problems.append(f"{name}: {e}")
+            continue
+        path = os.path.join(work_dir, f"{name}.pcf")
+        pins.atomic_write(path, pins.pcf_chunks(sections))
+        pcfs.append((name, board, path))
+    return pcfs, problems
+
+
+# Place and route one variant with one seed, returning nextpnr's report, or
+# None if it failed, and its log.
+def place_and_route(netlist, board, pcf, seed, freq, run_dir):
+    os.makedirs(run_dir, exist_ok=True)
+    package = pins.boards[board].package
+    report = os.path.join(run_dir, "report.json")
+    log = os.path.join(run_dir, "nextpnr.log")
+    cmd = [
+        "nextpnr-ice40",
+        PACKAGE_DEVICES[package],
+        "--package",
+        package.lower(),
+        "--json",
+        netlist,
+        "--pcf",
+        pcf,
+        "--seed",
+        str(seed),
+        "--report",
+        report,
+        "--asc",
+        os.path.join(run_dir, "design.asc"),
+    ]
+    if freq:
+        cmd += ["--freq", str(freq)]
+    with open(log, "w") as f:
+        result = subprocess.run(cmd, stdout=f, stderr=subprocess.STDOUT)
+    if result.returncode:
+        return None, log
+    with open(report) as f:
+        return json.load(f), log
+
+
+def run_sweep(netlist, pcfs, seeds, freq, jobs, work_dir):
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {
+            pool.submit(
+                place_and_route,
+                netlist,
+                board,
+                pcf,
+                seed,
+                freq,
+                os.path.join(work_dir, name, f"seed-{seed}"),
+            ): (name, seed)
+            for name, board, pcf in pcfs
+            for seed in seeds
+        }
+        results = {}
+        for future in concurrent.futures.as_completed(futures):
+            name, seed = futures[future]
+            report, log = future.result()
+            status = "ok" if report else f"failed, see {log}"
+            print(f"{name} seed {seed}: {status}", file=sys.stderr)
+            results[name, seed] = report
+    return results
+
+
+# A row for each clock of each variant, with the Fmax over the seeds that
+# routed and the utilization of the first of them.
+def report_rows(pcfs, seeds, results):
+    rows = []
+    for name, _, _ in pcfs:
+        reports = [results[name, s] for s in seeds if results[name, s]]
+        routed = f"{len(reports)}/{len(seeds)}"
+        if not reports:
+            rows.append([name, "-", routed] + ["-"] * (3 + len(UTILIZATION_BELS)))
+            continue
+
+        utilization = reports[0].get("utilization", {})
+        used = [
+            (
+                f"{utilization[bel]['used']}/{utilization[bel]['available']}"
+                if bel in utilization
+                else "-"
+            )
+            for bel, _ in UTILIZATION_BELS
+        ]
+        clocks = sorted({c for r in reports for c in r.get("fmax", {})})
+        for clock in clocks or ["-"]:
+            fmax = [
+                r["fmax"][clock]["achieved"]
+                for r in reports
+                if clock in r.get("fmax", {})
+            ]
+            stats = (
+                [
+                    f"{min(fmax):.1f}",
+                    f"{statistics.median(fmax):.1f}",
+                    f"{max(fmax):.1f}",
+                ]
+                if fmax
+                else ["-"] * 3
+            )
+            rows.append([name, clock, routed] + stats + used)
+    return rows
+
+
+def print_table(rows):
+    header = ["variant", "clock", "routed", "min", "median", "max MHz"]
+    header += [label for _, label in UTILIZATION_BELS]
+    widths = [max(len(str(r[i])) for r in [header] + rows) for i in range(len(header))]
+    for row in [header] + rows:
+        print(
+            "  ".join(
+                f"{cell:<{w}}" if i < 2 else f"{cell:>{w}}"
+                for i, (cell, w) in enumerate(zip(row, widths))
+            ).rstrip()
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Place and route a design over constraint variants and seeds."
+    )
+    parser.add_argument("sources", nargs="+", help="verilog sources of the design")
+    parser.add_argument("--top", required=True, help="top module of the design")
+    parser.add_argument(
+        "--variant",
+        action="append",
+        default=[],
+        help="a board and the stacks fitted to it, e.g. hx8k:R=sram,pmod "
+        "(may be repeated)",
+    )
+    parser.add_argument(
+        "--pcf",
+        action="append",
+        default=[],
+        metavar="NAME=BOARD:PCF",
+        help="an existing pcf for a board as a variant, e.g. one generated with "
+        "an alternative bit order (may be repeated)",
+    )
+    parser.add_argument(
+        "--seeds",
+        type=int,
+        default=DEFAULT_SEEDS,
+        help="number of seeds to run each variant with (default: %(default)s)",
+    )
+    parser.add_argument("--freq", type=float, help="target frequency in MHz")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="number of parallel nextpnr runs (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--work-dir",
+        help="directory for the netlist, pcfs and runs (default: a temporary "
+        "directory that is removed afterwards)",
+    )
+    args = parser.parse_args()
+
+    if not args.variant and not args.pcf:
+        parser.error("at least one --variant or --pcf is required")
+    try:
+        variants = [parse_variant(spec) for spec in args.variant]
+        pcf_variants = [parse_pcf_variant(spec) for spec in args.pcf]
+    except ValueError as e:
+        parser.error(str(e))
+    for tool in ("yosys", "nextpnr-ice40"):
+        if shutil.which(tool) is None:
+            parser.error(f"{tool} isn't on the path, e.g. run in the flake's shell")
+
+    tmp_dir = None
+    work_dir = args.work_dir
+    if work_dir is None:
+        tmp_dir = tempfile.TemporaryDirectory(prefix="nextpnr_sweep.")
+        work_dir = tmp_dir.name
+
+    try:
+        os.makedirs(work_dir, exist_ok=True)
+        netlist = synthesize(args.sources, args.top, work_dir)
+        ports = pins.read_netlist_ports(netlist, args.top)
+        pcfs, problems = write_pcfs(variants, pcf_variants, ports, work_dir)
+        for problem in problems:
+            print(f"skipped {problem}", file=sys.stderr)
+
+        seeds = range(1, args.seeds + 1)
+        results = run_sweep(netlist, pcfs, seeds, args.freq, args.jobs, work_dir)
+        print_table(report_rows(pcfs, seeds, results))
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+
+import argparse
+import concurrent.futures
+import glob
+import hashlib
+import os
+import sqlite3
+import sys
+
+import kicad
+import pins
+
+# This script keeps an SQLite database of the KiCad designs in pcb/, so that
+# questions like which nets reach a connector pin, or which footprints are on
+# a bus, can be answered without reparsing the designs.
+#
+# Each directory in pcb/ is a project and its design is the .kicad_pcb, or
+# the root .kicad_sch if there is no layout. Layouts also have the length of
+# each net's tracks.
+#
+# The database is refreshed before every query: projects whose files have a
+# new mtime or size are hashed and, if their contents changed, reparsed in
+# parallel.
+
+# Bump when the tables change, the database is then rebuilt from scratch.
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE files (
+    path TEXT PRIMARY KEY,
+    project TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+CREATE TABLE projects (
+    name TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    thickness REAL
+);
+CREATE TABLE footprints (
+    project TEXT NOT NULL,
+    ref TEXT NOT NULL,
+    value TEXT,
+    PRIMARY KEY (project, ref)
+);
+CREATE TABLE pads (
+    project TEXT NOT NULL,
+    ref TEXT NOT NULL,
+    number TEXT NOT NULL,
+    function TEXT,
+    net TEXT,
+    x REAL,
+    y REAL,
+    PRIMARY KEY (project, ref, number)
+);
+CREATE TABLE nets (
+    project TEXT NOT NULL,
+    net TEXT NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (project, net)
+);
+CREATE TABLE connector_pins (
+    project TEXT NOT NULL,
+    ref TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    pin INTEGER NOT NULL,
+    net TEXT,
+    PRIMARY KEY (project, ref, pin)
+);
+CREATE TABLE routes (
+    project TEXT NOT NULL,
+    net TEXT NOT NULL,
+    length REAL NOT NULL,
+    vias INTEGER NOT NULL,
+    PRIMARY KEY (project, net)
+);
+CREATE INDEX pads_net ON pads (net);
+CREATE INDEX pads_project_net ON pads (project, net);
+CREATE INDEX pads_function ON pads (function);
+CREATE INDEX nets_name ON nets (name);
+CREATE INDEX footprints_value ON footprints (value);
+CREATE INDEX connector_pins_pin ON connector_pins (pin);
+CREATE INDEX connector_pins_net ON connector_pins (net);
+"""
+
+TABLES = [
+    "files",
+    "projects",
+    "footprints",
+    "pads",
+    "nets",
+    "connector_pins",
+    "routes",
+]
+
+# Tables with a row per design item, replaced whenever a project is reparsed.
+DESIGN_TABLES = ["projects", "footprints", "pads", "nets", "connector_pins", "routes"]
+
+# The board to board connectors are FX18-120P plugs and FX18-120S sockets.
+CONNECTOR_KINDS = {"FX18-120P": "plug", "FX18-120S": "socket"}
+
+
+def default_db_path():
+    return os.path.join(pins.cache_root(), "pcb.sqlite")
+
+
+def project_files(pcb_dir, project):
+    return sorted(
+        glob.glob(os.path.join(pcb_dir, project, "*.kicad_pcb"))
+        + glob.glob(os.path.join(pcb_dir, project, "*.kicad_sch"))
+    )
+
+
+def project_source(pcb_dir, project):
+    for ext in (".kicad_pcb", ".kicad_sch"):
+        path = os.path.join(pcb_dir, project, project + ext)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+# the project of a design path relative to pcb/, e.g. the kicad_source of a
+# board or breakout
+def source_project(kicad_source):
+    return os.path.dirname(kicad_source)
+
+
+def find_projects(pcb_dir):
+    return sorted(
+        name
+        for name in os.listdir(pcb_dir)
+        if project_source(pcb_dir, name) is not None
+    )
+
+
+def file_sha256(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def connector_kind(value):
+    for prefix, kind in CONNECTOR_KINDS.items():
+        if value and value.startswith(prefix):
+            return kind
+    return None
+
+
+# Parse a project's design into rows for the design tables. This runs in a
+# worker process, so only returns plain data.
+def read_project(pcb_dir, project):
+    source = project_source(pcb_dir, project)
+    values = {}
+    components = kicad.read_design(source, values)
+
+    rows = {table: [] for table in DESIGN_TABLES}
+    thickness = None
+    if source.endswith(".kicad_pcb"):
+        routes, thickness = kicad.read_routes(source)
+        rows["routes"] = [
+            (project, net, route.length, route.vias)
+            for net, route in sorted(routes.items())
+        ]
+    rows["projects"].append((project, os.path.relpath(source, pcb_dir), thickness))
+    nets = set()
+    for ref, pins in sorted(components.items()):
+        rows["footprints"].append((project, ref, values.get(ref)))
+        kind = connector_kind(values.get(ref))
+        for pin in pins.values():
+            rows["pads"].append(
+                (project, ref, pin.number, pin.function, pin.net, pin.x, pin.y)
+            )
+            if pin.net:
+                nets.add(pin.net)
+            if kind and pin.number.isdigit():
+                rows["connector_pins"].append(
+                    (project, ref, kind, int(pin.number), pin.net)
+                )
+    rows["nets"] = [(project, net, kicad.net_name(net)) for net in sorted(nets)]
+    return project, rows
+
+
+def open_db(path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    db = sqlite3.connect(path, timeout=30)
+    (version,) = db.execute("PRAGMA user_version").fetchone()
+    if version != SCHEMA_VERSION:
+        with db:
+            for table in TABLES:
+                db.execute(f"DROP TABLE IF EXISTS {table}")
+            db.executescript(SCHEMA)
+            db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return db
+
+
+# Bring the database up to date with the designs in pcb_dir, returning the
+# projects that were reparsed.
+def refresh(db, pcb_dir=kicad.PCB_DIR, jobs=None):
+    known = {}
+    for path, project, mtime_ns, size, sha in db.execute("SELECT * FROM files"):
+        known.setdefault(project, {})[path] = (mtime_ns, size, sha)
+
+    projects = find_projects(pcb_dir)
+    stale = []
+    file_rows = []
+    for project in projects:
+        old = known.get(project, {})
+        new = {}
+        for path in project_files(pcb_dir, project):
+            st = os.stat(path)
+            new[os.path.relpath(path, pcb_dir)] = (st.st_mtime_ns, st.st_size)
+        if new.keys() == old.keys() and all(
+            old[path][:2] == stat for path, stat in new.items()
+        ):
+            continue
+
+        # touched files whose contents are unchanged only need their stat
+        # updating
+        changed = False
+        for path, (mtime_ns, size) in new.items():
+            sha = file_sha256(os.path.join(pcb_dir, path))
+            changed = changed or path not in old or old[path][2] != sha
+            file_rows.append((path, project, mtime_ns, size, sha))
+        if changed or new.keys() != old.keys():
+            stale.append(project)
+
+    removed = [p for p in known if p not in projects]
+
+    if len(stale) > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+            parsed = list(executor.map(read_project, [pcb_dir] * len(stale), stale))
+    else:
+        parsed = [read_project(pcb_dir, project) for project in stale]
+
+    with db:
+        for project in stale + removed:
+            for table in ["files"] + DESIGN_TABLES:
+                key = "name" if table == "projects" else "project"
+                db.execute(f"DELETE FROM {table} WHERE {key} = ?", (project,))
+        db.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)", file_rows)
+        for project, rows in parsed:
+            for table, table_rows in rows.items():
+                if table_rows:
+                    marks = ", ".join("?" * len(table_rows[0]))
+                    db.executemany(f"INSERT INTO {table} VALUES ({marks})", table_rows)
+    return stale
+
+
+# An up to date database, for use by the other scripts.
+def connect(path=None, pcb_dir=kicad.PCB_DIR):
+    db = open_db(path or default_db_path())
+    refresh(db, pcb_dir)
+    return db
+
+
+# A project's components in the same form as kicad.read_design.
+def load_components(db, project):
+    components = {}
+    for ref, number, function, net, x, y in db.execute(
+        "SELECT ref, number, function, net, x, y FROM pads WHERE project = ?",
+        (project,),
+    ):
+        components.setdefault(ref, {})[number] = kicad.Pin(number, function, net, x, y)
+    return components
+
+
+# A project's routes by net, in the same form as kicad.read_routes, which are
+# empty if it has no layout.
+def load_routes(db, project):
+    routes = {
+        net: kicad.Route(length, vias)
+        for net, length, vias in db.execute(
+            "SELECT net, length, vias FROM routes WHERE project = ?", (project,)
+        )
+    }
+    row = db.execute(
+        "SELECT thickness FROM projects WHERE name = ?", (project,)
+    ).fetchone()
+    return routes, (row[0] if row and row[0] is not None else 0.0)
+
+
+def print_rows(rows):
+    rows = [["" if v is None else str(v) for v in row] for row in rows]
+    if not rows:
+        return
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    for row in rows:
+        print("  ".join(v.ljust(w) for v, w in zip(row, widths)).rstrip())
+
+
+def project_filter(project, column="project"):
+    if project is None:
+        return "", ()
+    return f" AND {column} = ?", (project,)
+
+
+# Nets matching a glob, by their full or short name, and the pads on them.
+def query_net(db, pattern, project=None):
+    where, params = project_filter(project, "n.project")
+    return db.execute(
+        "SELECT n.project, n.net, p.ref, p.number, p.function FROM nets n"
+        " JOIN pads p ON p.project = n.project AND p.net = n.net"
+        f" WHERE (n.name GLOB ? OR n.net GLOB ?){where}"
+        " ORDER BY n.project, n.net, p.ref, p.number",
+        (pattern, pattern) + params,
+    ).fetchall()
+
+
+# What each board to board connector's pin is wired to on each board.
+def query_pin(db, pin, project=None):
+    where, params = project_filter(project, "c.project")
+    return db.execute(
+        "SELECT c.project, c.ref, c.kind, c.net, p.ref, p.number, p.function"
+        " FROM connector_pins c"
+        " LEFT JOIN pads p ON p.project = c.project AND p.net = c.net"
+        " AND p.ref != c.ref"
+        f" WHERE c.pin = ?{where}"
+        " ORDER BY c.project, c.ref, p.ref, p.number",
+        (pin,) + params,
+    ).fetchall()
+
+
+def query_ref(db, ref, project=None):
+    where, params = project_filter(project)
+    return db.execute(
+        "SELECT project, ref, number, function, net FROM pads"
+        f" WHERE ref = ?{where} ORDER BY project, ref, number",
+        (ref,) + params,
+    ).fetchall()
+
+
+# Footprints with a pad on a net matching a glob, e.g. the SRAM bus.
+def query_footprints(db, pattern, project=None):
+    where, params = project_filter(project, "n.project")
+    return db.execute(
+        "SELECT n.project, p.ref, f.value, COUNT(DISTINCT n.net) FROM nets n"
+        " JOIN pads p ON p.project = n.project AND p.net = n.net"
+        " JOIN footprints f ON f.project = p.project AND f.ref = p.ref"
+        f" WHERE (n.name GLOB ? OR n.net GLOB ?){where}"
+        " GROUP BY n.project, p.ref ORDER BY n.project, p.ref",
+        (pattern, pattern) + params,
+    ).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Query a database of the KiCad designs."
+    )
+    parser.add_argument(
+        "--db",
+        default=default_db_path(),
+        help="database file (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--pcb-dir",
+        default=kicad.PCB_DIR,
+        help="directory of KiCad projects (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="number of designs to parse in parallel (default: CPU count)",
+    )
+    parser.add_argument(
+        "--no-refresh",
+        action="store_true",
+        help="query the database as is, without checking the designs",
+    )
+    parser.add_argument("--project", help="only look at this project")
+
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("refresh", help="update the database and list changes")
+    net = subparsers.add_parser("net", help="pads on nets matching a glob")
+    net.add_argument("pattern")
+    pin = subparsers.add_parser(
+        "pin", help="what a board to board connector pin is wired to"
+    )
+    pin.add_argument("pin", type=int)
+    ref = subparsers.add_parser("ref", help="pads of a footprint")
+    ref.add_argument("ref")
+    footprints = subparsers.add_parser(
+        "footprints", help="footprints on nets matching a glob"
+    )
+    footprints.add_argument("pattern")
+    sql = subparsers.add_parser("sql", help="run an SQL query")
+    sql.add_argument("query")
+    args = parser.parse_args()
+
+    try:
+        db = open_db(args.db)
+        if not args.no_refresh:
+            stale = refresh(db, args.pcb_dir, args.jobs)
+            if args.command == "refresh":
+                for project in stale:
+                    print(f"updated {project}")
+
+        if args.command == "net":
+            print_rows(query_net(db, args.pattern, args.project))
+        elif args.command == "pin":
+            print_rows(query_pin(db, args.pin, args.project))
+        elif args.command == "ref":
+            print_rows(query_ref(db, args.ref, args.project))
+        elif args.command == "footprints":
+            print_rows(query_footprints(db, args.pattern, args.project))
+        elif args.command == "sql":
+            print_rows(db.execute(args.query).fetchall())
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+
+import argparse
+import mmap
+import struct
+import sys
+
+from collections import namedtuple
+
+# A resolved pin map is a variant's pins, as pins.py --pinmap writes them, in
+# a compact binary file that readers memory map rather than importing the
+# board modules and resolving the variant again. Parallel jobs reading the
+# same file share its pages in the page cache.
+#
+# The file is, in order:
+#   header:      HEADER
+#   records:     a RECORD for each pin, in pcf order
+#   name index:  u32 record numbers, sorted by name
+#   ball index:  u32 record numbers, sorted by ball and then record number
+#   strings:     each a u16 length followed by utf-8 bytes
+#
+# Strings are referred to by their offset in the string table, and are
+# shared, e.g. a ball's name is stored once however many pins are on it.
+# All values are little endian.
+
+MAGIC = b"ICE40PIN"
+VERSION = 1
+
+# magic, version, record count, then the offsets of the name index, the
+# ball index and the string table from the start of the file
+HEADER = struct.Struct("<8sIIIII")
+
+# offsets of the name, group, ball and logical pin strings, the bit (-1 for
+# a single pin), the side (0 for an on board signal) and the ice40's bank
+# (255 if it isn't known)
+RECORD = struct.Struct("<IIIIiBBxx")
+
+INDEX = struct.Struct("<I")
+STRING_LENGTH = struct.Struct("<H")
+
+NO_BANK = 255
+
+Pin = namedtuple("Pin", "name side group bit ball bank logical")
+
+
+# Pack pins, a list of Pin, into the file's bytes.
+def pack(pins):
+    strings = bytearray()
+    offsets = {}
+
+    def string(s):
+        if s not in offsets:
+            data = s.encode()
+            offsets[s] = len(strings)
+            strings.extend(STRING_LENGTH.pack(len(data)) + data)
+        return offsets[s]
+
+    records = b"".join(
+        RECORD.pack(
+            string(p.name),
+            string(p.group),
+            string(p.ball),
+            string(p.logical),
+            p.bit,
+            ord(p.side) if p.side else 0,
+            NO_BANK if p.bank is None else p.bank,
+        )
+        for p in pins
+    )
+    numbers = range(len(pins))
+    name_index = sorted(numbers, key=lambda i: pins[i].name.encode())
+    ball_index = sorted(numbers, key=lambda i: (pins[i].ball.encode(), i))
+
+    name_index_offset = HEADER.size + len(records)
+    ball_index_offset = name_index_offset + INDEX.size * len(pins)
+    strings_offset = ball_index_offset + INDEX.size * len(pins)
+    header = HEADER.pack(
+        MAGIC,
+        VERSION,
+        len(pins),
+        name_index_offset,
+        ball_index_offset,
+        strings_offset,
+    )
+    return b"".join(
+        [header, records]
+        + [INDEX.pack(i) for i in name_index]
+        + [INDEX.pack(i) for i in ball_index]
+        + [bytes(strings)]
+    )
+
+
+class PinMap:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self.data) < HEADER.size:
+            raise ValueError(f"{path}: too short to be a pin map")
+        (
+            magic,
+            version,
+            self.count,
+            self.name_index,
+            self.ball_index,
+            self.strings,
+        ) = HEADER.unpack_from(self.data)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not a pin map")
+        if version != VERSION:
+            raise ValueError(f"{path}: pin map version {version}, expected {VERSION}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.data.close()
+
+    def __len__(self):
+        return self.count
+
+    def string_bytes(self, offset):
+        start = self.strings + offset
+        (length,) = STRING_LENGTH.unpack_from(self.data, start)
+        start += STRING_LENGTH.size
+        return self.data[start : start + length]
+
+    def string(self, offset):
+        return self.string_bytes(offset).decode()
+
+    def record_fields(self, i):
+        return RECORD.unpack_from(self.data, HEADER.size + RECORD.size * i)
+
+    def record(self, i):
+        name, group, ball, logical, bit, side, bank = self.record_fields(i)
+        return Pin(
+            self.string(name),
+            chr(side) if side else None,
+            self.string(group),
+            bit,
+            self.string(ball),
+            None if bank == NO_BANK else bank,
+            self.string(logical),
+        )
+
+    def __iter__(self):
+        return (self.record(i) for i in range(self.count))
+
+    def index_entry(self, index, position):
+        return INDEX.unpack_from(self.data, index + INDEX.size * position)[0]
+
+    # The first position in index whose record's field sorts at or after key.
+    def lower_bound(self, index, field, key):
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            fields = self.record_fields(self.index_entry(index, mid))
+            if self.string_bytes(fields[field]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def lookup(self, name):
+        key = name.encode()
+        position = self.lower_bound(self.name_index, 0, key)
+        if position < self.count:
+            i = self.index_entry(self.name_index, position)
+            if self.string_bytes(self.record_fields(i)[0]) == key:
+                return self.record(i)
+        raise KeyError(name)
+
+    # every pin on a ball, in pcf order
+    def on_ball(self, ball):
+        key = ball.encode()
+        pins = []
+        position = self.lower_bound(self.ball_index, 2, key)
+        while position < self.count:
+            i = self.index_entry(self.ball_index, position)
+            if self.string_bytes(self.record_fields(i)[2]) != key:
+                break
+            pins.append(self.record(i))
+            position += 1
+        return pins
+
+
+def print_pins(pins):
+    for p in pins:
+        bit = "" if p.bit < 0 else p.bit
+        bank = "" if p.bank is None else p.bank
+        print(
+            f"{p.name:<32} {p.side or '-':<2} {p.group:<24} {bit!s:>3} "
+            f"{p.ball:>4} {bank!s:>2} {p.logical}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Look up pins in a pin map written by pins.py --pinmap."
+    )
+    parser.add_argument("pinmap", help="pin map file")
+    parser.add_argument("names", nargs="*", help="pin names to look up")
+    parser.add_argument(
+        "--ball", action="append", default=[], help="list the pins on this ball"
+    )
+    args = parser.parse_args()
+
+    try:
+        with PinMap(args.pinmap) as pin_map:
+            if not args.names and not args.ball:
+                print_pins(pin_map)
+            print_pins(pin_map.lookup(name) for name in args.names)
+            for ball in args.ball:
+                print_pins(pin_map.on_ball(ball))
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        sys.exit(1)
+    except KeyError as e:
+        print(f"error: no pin named {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,32 @@
 #!/usr/bin/env python3
 
+import argparse
+import collections
+import collections.abc
+import csv
+import functools
+import hashlib
+import importlib
+import importlib.util
+import io
+import itertools
+import json
+import os
+import re
 import sys
+import tempfile
+import time
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
-from boards import hx4k, hx8k
+import pinmap
 
 # This script generates pcf files for the vanilla ice peripheral boards.
 #
 # It is easier to transcribe the mappings for each level rather than try to
 # trace all the connections back from destination to their source. It's also
-# easier to audit for correctness as the lists below can be compared
+# easier to audit for correctness as the lists below, and those for the core
+# boards in boards/ and the breakout boards in breakouts/, can be compared
 # directly to the schematics.
 #
 # Once each layer's mapping is defined, it's relatively simple to traverse the
@@ -36,6 +52,30 @@ class IcePinConfig:
     # same format as above, but for the connector on the right of the board
     right_pin_to_logical: {int, str}
 
+    # package of the ice40, e.g. CT256, see package_balls
+    package: str
+
+    # Flat tables, indexed by peripheral connector pin, of the physical pin
+    # each peripheral pin lands on (None if it isn't routed to the ice40.)
+    # These are compiled once when the config is loaded so that resolving
+    # groups, aliases and breakouts is a single index rather than a walk
+    # through the dicts above.
+    left_pin_to_phys: tuple = field(init=False, repr=False)
+    right_pin_to_phys: tuple = field(init=False, repr=False)
+
+    # the complement of each differential pair's true physical pin, see
+    # compile_lvds_pairs
+    lvds_pairs: dict = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.left_pin_to_phys = compile_pin_table(
+            self.left_pin_to_logical, self.logical_pin_to_phys
+        )
+        self.right_pin_to_phys = compile_pin_table(
+            self.right_pin_to_logical, self.logical_pin_to_phys
+        )
+        self.lvds_pairs = compile_lvds_pairs(self.logical_pin_to_phys)
+
 
 # base peripheral groups, i.e. pins in groups of 8.
 peripheral_groups = [
@@ -53,195 +93,6 @@ peripheral_groups = [
     ("L", [90, 88, 86, 84, 89, 87, 85, 83]),
 ]
 
-# sram chip, mapped to the peripheral groups
-sram_groups = [
-    (
-        "SRAM_ADDR_BUS",
-        [
-            "C[7]",
-            "C[3]",
-            "C[6]",
-            "C[2]",
-            "C[5]",
-            "A[0]",
-            "A[4]",
-            "A[1]",
-            "A[5]",
-            "B[6]",
-            "B[3]",
-            "B[7]",
-            "C[0]",
-            "C[4]",
-            "C[1]",
-            "G[3]",
-            "G[6]",
-            "G[2]",
-            "G[5]",
-            "G[1]",
-        ],
-    ),
-    (
-        "SRAM_DATA_BUS",
-        [
-            "D[4]",
-            "D[1]",
-            "D[5]",
-            "D[2]",
-            "D[6]",
-            "D[3]",
-            "D[7]",
-            "G[0]",
-            "B[2]",
-            "B[5]",
-            "B[1]",
-            "B[4]",
-            "B[0]",
-            "A[7]",
-            "A[3]",
-            "A[6]",
-        ],
-    ),
-]
-
-sram_signals = [("SRAM_CS_N", "D[0]"), ("SRAM_OE_N", "A[2]"), ("SRAM_WE_N", "G[4]")]
-
-sram_256_a_groups = [
-    (
-        "SRAM_256_A_ADDR_BUS",
-        [
-            "A[0]",
-            "A[4]",
-            "A[1]",
-            "A[5]",
-            "A[2]",
-            "B[3]",
-            "B[7]",
-            "C[0]",
-            "C[4]",
-            "C[1]",
-            "D[7]",
-            "D[3]",
-            "D[6]",
-            "D[2]",
-            "D[5]",
-            "C[6]",
-            "C[2]",
-            "C[5]",
-        ],
-    ),
-    (
-        "SRAM_256_A_DATA_BUS",
-        [
-            "A[6]",
-            "A[3]",
-            "A[7]",
-            "B[0]",
-            "B[4]",
-            "B[1]",
-            "B[5]",
-            "B[2]",
-            "D[1]",
-            "D[4]",
-            "D[0]",
-            "C[7]",
-        ],
-    ),
-]
-
-sram_256_a_signals = [
-    ("SRAM_256_A_OE_N", "C[3]"),
-    ("SRAM_256_A_WE_N", "B[6]"),
-]
-
-sram_256_b_groups = [
-    (
-        "SRAM_256_B_ADDR_BUS",
-        [
-            "G[0]",
-            "G[4]",
-            "G[1]",
-            "G[5]",
-            "G[2]",
-            "H[3]",
-            "H[7]",
-            "J[6]",
-            "J[3]",
-            "J[7]",
-            "J[2]",
-            "J[5]",
-            "J[1]",
-            "J[4]",
-            "J[0]",
-            "K[6]",
-            "K[3]",
-            "K[7]",
-        ],
-    ),
-    (
-        "SRAM_256_B_DATA_BUS",
-        [
-            "G[6]",
-            "G[3]",
-            "G[7]",
-            "H[0]",
-            "H[4]",
-            "H[1]",
-            "H[5]",
-            "H[2]",
-            "K[0]",
-            "K[4]",
-            "K[1]",
-            "K[5]",
-        ],
-    ),
-]
-
-sram_256_b_signals = [
-    ("SRAM_256_B_OE_N", "K[2]"),
-    ("SRAM_256_B_WE_N", "H[6]"),
-]
-
-adc_groups = [
-    (
-        "ADC_X",
-        [
-            "F[6]",
-            "F[2]",
-            "E[0]",
-            "E[4]",
-            "E[1]",
-            "E[5]",
-            "E[6]",
-            "E[2]",
-            "E[7]",
-            "E[3]",
-        ],
-    ),
-    (
-        "ADC_Y",
-        [
-            "F[4]",
-            "F[0]",
-            "F[5]",
-            "F[1]",
-            "F[3]",
-            "F[7]",
-            "L[7]",
-            "L[3]",
-            "L[6]",
-            "L[2]",
-        ],
-    ),
-]
-
-adc_signals = [
-    ("ADC_CLK_TO_ADC", "L[1]"),
-    ("ADC_CLK_TO_FPGA", "L[5]"),
-    ("ADC_RED", "I[0]"),
-    ("ADC_GRN", "L[0]"),
-    ("ADC_BLU", "L[4]"),
-]
-
 
 def b2b_pin_to_pin(pin):
     if pin <= 60:
@@ -260,8 +111,46 @@ def peripheral_pin_to_ice_pin(pin, io_dict, pin_dict):
     return traverse(b2b_pin_to_pin(pin), io_dict, pin_dict)
 
 
-def peripheral_group_to_ice_group(grp, io_dict, pin_dict):
-    return [peripheral_pin_to_ice_pin(p, io_dict, pin_dict) for p in grp]
+# board to board connectors have pins numbered 1 through 120
+B2B_PINS = 120
+
+
+def compile_pin_table(io_dict, pin_dict):
+    table = [None] * (B2B_PINS + 1)
+    if io_dict:
+        for pin in range(1, B2B_PINS + 1):
+            try:
+                table[pin] = peripheral_pin_to_ice_pin(pin, io_dict, pin_dict)
+            except KeyError:
+                pass
+    return tuple(table)
+
+
+# The ice40's differential inputs are the pairs of io in bank 3, the left
+# bank, whose logical names are IOL_nA and IOL_nB. The A pin is the true
+# input, and a differential input is placed by it alone, the B pin being
+# taken along with it.
+LVDS_PIN_RE = re.compile(r"IOL_(\d+)([AB])$")
+
+
+def compile_lvds_pairs(pin_dict):
+    halves = {}
+    for logical, phys in pin_dict.items():
+        m = LVDS_PIN_RE.match(logical)
+        if m:
+            halves[m.groups()] = phys
+    return {
+        phys: halves[(n, "B")]
+        for (n, half), phys in halves.items()
+        if half == "A" and (n, "B") in halves
+    }
+
+
+def peripheral_group_to_ice_group(grp, pin_table):
+    pins = [pin_table[p] for p in grp]
+    if None in pins:
+        raise KeyError(grp[pins.index(None)])
+    return pins
 
 
 def groups_to_pins(groups):
@@ -272,172 +161,2020 @@ def groups_to_pins(groups):
     return result
 
 
+# The generators below produce the pcf as a sequence of sections, where each
+# section is an iterable of (name, pin) pairs. Sections are separated by a
+# blank line in the output.
+
+
+# pins that aren't available, i.e. None, are skipped but keep their index
 def ice_group_to_pcf_pin(label, pins, width=2):
-    return "\n".join(
-        f"set_io {label}_{i+1:0{width}} {pin}" for i, pin in enumerate(pins)
+    return (
+        (f"{label}_{i+1:0{width}}", pin)
+        for i, pin in enumerate(pins)
+        if pin is not None
     )
 
 
 def ice_group_to_pcf_array(label, pins):
-    return "\n".join(f"set_io {label}[{i}] {pin}" for i, pin in enumerate(pins))
-
-
-def gen_pcf_from_groups(side: str, ice_groups):
-    ice_group_pins = groups_to_pins(ice_groups)
-
-    # pmod pins
-    concatenated_groups = sum([pins for _, pins in ice_groups], [])
-    ice_pins = [p for p in concatenated_groups]
-
-    base_to_p = {p[0]: p[1] for p in ice_group_pins}
-
-    def base_group_to_ice_group(grp):
-        return [base_to_p[p] for p in grp]
-
-    # base groups
-    for g in ice_groups:
-        lable, pins = g
-        print(ice_group_to_pcf_pin(f"{side}_{lable}", pins))
-        print()
-        print(ice_group_to_pcf_array(f"{side}_{lable}", pins))
-        print()
-
-    # pmod aliases
-    for g in ice_groups:
-        lable, pins = g
-        print(ice_group_to_pcf_array(f"{side}_PMOD_{lable}", pins))
-        print()
-
-    # all pmods
-    print(ice_group_to_pcf_array(f"{side}_PMOD", [p for p in ice_pins]))
-    print()
-
-    # adc
-    adc_ice_groups = [(l, base_group_to_ice_group(p)) for l, p in adc_groups]
-
-    for s, p in adc_signals:
-        print(f"set_io {side}_{s} {base_to_p[p]}")
-
-    print()
-    for g in adc_ice_groups:
-        lable, pins = g
-        print(ice_group_to_pcf_pin(f"{side}_{lable}", pins))
-        print()
-        print(ice_group_to_pcf_array(f"{side}_{lable}", pins))
-        print()
-
-    # sram
-    sram_ice_groups = [(l, base_group_to_ice_group(p)) for l, p in sram_groups]
-
-    for s, p in sram_signals:
-        print(f"set_io {side}_{s} {base_to_p[p]}")
-
-    print()
-    for g in sram_ice_groups:
-        lable, pins = g
-        print(ice_group_to_pcf_pin(f"{side}_{lable}", pins))
-        print()
-        print(ice_group_to_pcf_array(f"{side}_{lable}", pins))
-        print()
-
-    # sram 256_a
-    sram_256_a_ice_groups = [
-        (l, base_group_to_ice_group(p)) for l, p in sram_256_a_groups
+    return ((f"{label}[{i}]", pin) for i, pin in enumerate(pins) if pin is not None)
+
+
+def ice_group_to_pcf(label, pins):
+    yield ice_group_to_pcf_pin(label, pins)
+    yield ice_group_to_pcf_array(label, pins)
+
+
+def signals_to_pcf(side, signals, base_to_p):
+    return ((f"{side}_{s}", base_to_p[p]) for s, p in signals)
+
+
+# Boards that can be fitted to a core board's connectors. Each is defined by
+# a module in breakouts/, which is only imported when the board is used.
+breakout_modules = {
+    "passthrough": "breakouts.passthrough",
+    "pmod": "breakouts.pmod",
+    "adc": "breakouts.adc",
+    "sram": "breakouts.sram",
+    "sram-256x2": "breakouts.sram_256x2",
+}
+
+
+# A board that can be fitted to a core board's connector, possibly on top of
+# other boards. breakouts are the (groups, signals) tables of the devices on
+# the board, in terms of the base group pins, e.g. A[0]. passthrough boards
+# have a socket on top that passes the pins they don't use straight through
+# to the next board up, other than blocked_pins, the base group pins that
+# aren't wired to the socket, e.g. G[7] on the sram board. pin_aliases adds
+# the _01 style name of each group pin, and with optional_pins a pin that
+# doesn't reach the core board is left out rather than being an error.
+# clocks and delays are the board's timing, for the sdc, and the delays of
+# any asynchronous srams on the board are added from their timing, see
+# sram_delays. diff_pairs are the board's differential inputs, as (label,
+# pairs) where each pair is the (true, complement) base group pins, e.g.
+# ("A[7]", "E[3]"). Each pair is named on its true pin alone and has to land
+# on one of the ice40's differential pairs.
+@dataclass(frozen=True)
+class Breakout:
+    name: str
+    breakouts: tuple
+    passthrough: bool
+    pin_aliases: bool = True
+    optional_pins: bool = False
+    clocks: tuple = ()
+    delays: tuple = ()
+    diff_pairs: tuple = ()
+    blocked_pins: tuple = ()
+
+
+# The input and output delays, relative to the core board's CLK, of an
+# asynchronous sram whose address and control signals, and data, are the
+# groups and signals in control and data. timing is the sram's datasheet
+# parameters and the delay of the traces between it and the ice40, in ns.
+# Reads and writes are driven from CLK, so a read's data is valid the later
+# of an address access time, t_aa, and an OE_N access time, t_doe, after
+# the edge, having crossed the boards in each direction.
+def sram_delays(timing, control, data):
+    board_min = timing["board_delay_min"]
+    board_max = timing["board_delay_max"]
+    t_read = max(timing["t_aa"], timing["t_doe"])
+    return [
+        (
+            "output",
+            None,
+            board_min - timing["t_ha"],
+            board_max + timing["t_sa"],
+            control,
+        ),
+        ("output", None, board_min - timing["t_hd"], board_max + timing["t_sd"], data),
+        ("input", None, timing["t_oha"] + 2 * board_min, t_read + 2 * board_max, data),
     ]
 
-    for s, p in sram_256_a_signals:
-        print(f"set_io {side}_{s} {base_to_p[p]}")
 
-    print()
-    for g in sram_256_a_ice_groups:
-        lable, pins = g
-        print(ice_group_to_pcf_pin(f"{side}_{lable}", pins))
-        print()
-        print(ice_group_to_pcf_array(f"{side}_{lable}", pins))
-        print()
+@functools.lru_cache(maxsize=None)
+def load_breakout(name):
+    if name not in breakout_modules:
+        raise ValueError(f"unknown board '{name}'")
+
+    module = importlib.import_module(breakout_modules[name])
+    return Breakout(
+        name,
+        tuple(module.breakouts),
+        module.passthrough,
+        getattr(module, "pin_aliases", True),
+        getattr(module, "optional_pins", False),
+        tuple(getattr(module, "clocks", ())),
+        tuple(
+            (direction, clock, min_delay, max_delay, tuple(labels))
+            for direction, clock, min_delay, max_delay, labels in list(
+                getattr(module, "delays", ())
+            )
+            + [
+                delay
+                for timing, control, data in getattr(module, "srams", ())
+                for delay in sram_delays(timing, control, data)
+            ]
+        ),
+        tuple(
+            (label, tuple(tuple(pair) for pair in pairs))
+            for label, pairs in getattr(module, "diff_pairs", ())
+        ),
+        tuple(getattr(module, "blocked_pins", ())),
+    )
+
+
+# peripheral pin of each base group pin, e.g. A[0] -> 3
+base_pin_numbers = dict(groups_to_pins(peripheral_groups))
+
 
-    # sram 256_b
-    sram_256_b_ice_groups = [
-        (l, base_group_to_ice_group(p)) for l, p in sram_256_b_groups
+def breakout_pins(breakout):
+    names = [
+        name
+        for groups, signals in breakout.breakouts
+        for name in [p for _, grp in groups for p in grp] + [p for _, p in signals]
     ]
+    names += [p for _, pairs in breakout.diff_pairs for pair in pairs for p in pair]
+    return [(name, base_pin_numbers[name]) for name in names]
+
+
+# The permutation a board applies to the board above it: indexed by the
+# upper board's connector pin, it gives the pin on this board's connector
+# that it is wired to, or None. A passthrough board's socket pin is its plug
+# pin +/-60, which undoes the b2b hop, so every pin the board doesn't use
+# itself, or block, is passed straight through.
+@functools.lru_cache(maxsize=None)
+def board_permutation(board_name):
+    breakout = load_breakout(board_name)
+    if not breakout.passthrough:
+        return (None,) * (B2B_PINS + 1)
+
+    used = {p for _, p in breakout_pins(breakout)}
+    used |= {base_pin_numbers[p] for p in breakout.blocked_pins}
+    return tuple(None if p == 0 or p in used else p for p in range(B2B_PINS + 1))
+
+
+# The composed permutation of a stack of boards, listed bottom to top: the
+# pin on the core board's connector that each pin of the next board up lands
+# on. Stacks share prefixes, e.g. sram,pmod and sram,adc, so compositions are
+# memoized by prefix.
+@functools.lru_cache(maxsize=None)
+def stack_permutation(stack):
+    if not stack:
+        return (None,) + tuple(range(1, B2B_PINS + 1))
+
+    below = stack_permutation(stack[:-1])
+    return tuple(None if p is None else below[p] for p in board_permutation(stack[-1]))
+
+
+# the board in a stack that keeps a pin of the next board up from reaching
+# the core board
+def stack_blocker(stack, pin):
+    for board_name in reversed(stack):
+        pin = board_permutation(board_name)[pin]
+        if pin is None:
+            return board_name
+    return None
+
+
+def check_stack(stack):
+    for depth, board_name in enumerate(stack):
+        breakout = load_breakout(board_name)
+
+        below = stack[:depth]
+        if below and not load_breakout(below[-1]).passthrough:
+            raise ValueError(f"{below[-1]} can't have {board_name} stacked on it")
+
+        if breakout.optional_pins:
+            continue
+
+        perm = stack_permutation(below)
+        for name, pin in breakout_pins(breakout):
+            if perm[pin] is None:
+                raise ValueError(
+                    f"{board_name} needs {name} (pin {pin}), "
+                    f"which {stack_blocker(below, pin)} doesn't pass through"
+                )
+
+
+def gen_breakout_pcf(side, breakout, pin_table):
+    base_to_p = {
+        name: pin_table[p]
+        for name, p in base_pin_numbers.items()
+        if pin_table[p] is not None
+    }
+    if breakout.optional_pins:
+        base_to_p = collections.defaultdict(lambda: None, base_to_p)
+
+    for groups, signals in breakout.breakouts:
+        if signals:
+            yield (
+                (name, pin)
+                for name, pin in signals_to_pcf(side, signals, base_to_p)
+                if pin is not None
+            )
+
+        for label, grp in groups:
+            pins = [base_to_p[p] for p in grp]
+            if breakout.pin_aliases:
+                yield ice_group_to_pcf_pin(f"{side}_{label}", pins)
+            yield ice_group_to_pcf_array(f"{side}_{label}", pins)
+
+    # a pair whose complement doesn't reach the ice40 can't be used
+    for label, pairs in breakout.diff_pairs:
+        pins = [base_to_p[p] if base_to_p[n] is not None else None for p, n in pairs]
+        if breakout.pin_aliases:
+            yield ice_group_to_pcf_pin(f"{side}_{label}", pins)
+        yield ice_group_to_pcf_array(f"{side}_{label}", pins)
+
+
+# With a stack, the boards in it, listed bottom to top, are generated through
+# the boards below them. Without one, every breakout is generated as if it
+# were fitted directly to the core board.
+def gen_side_pcf(side, pin_table, stack=None):
+    yield from gen_base_pcf(side, pin_table)
+    for breakout, table in side_breakouts(pin_table, stack):
+        yield from gen_breakout_pcf(side, breakout, table)
+
+
+# base groups, i.e. the core board's connector
+def gen_base_pcf(side, pin_table):
+    ice_groups = [
+        (l, peripheral_group_to_ice_group(g, pin_table)) for l, g in peripheral_groups
+    ]
+    for label, pins in ice_groups:
+        yield from ice_group_to_pcf(f"{side}_{label}", pins)
 
-    for s, p in sram_256_b_signals:
-        print(f"set_io {side}_{s} {base_to_p[p]}")
 
-    print()
-    for g in sram_256_b_ice_groups:
-        lable, pins = g
-        print(ice_group_to_pcf_pin(f"{side}_{lable}", pins))
-        print()
-        print(ice_group_to_pcf_array(f"{side}_{lable}", pins))
-        print()
+# The breakouts fitted to a side and the pin table each of them sees through
+# the boards below it.
+def side_breakouts(pin_table, stack=None):
+    if stack is None:
+        for name in breakout_modules:
+            yield load_breakout(name), pin_table
+        return
 
+    for depth, board_name in enumerate(stack):
+        perm = stack_permutation(stack[:depth])
+        yield load_breakout(board_name), [
+            None if p is None else pin_table[p] for p in perm
+        ]
 
-def gen_left_pcf(pin_config):
-    ice_groups = [
-        (
-            l,
-            peripheral_group_to_ice_group(
-                g, pin_config.left_pin_to_logical, pin_config.logical_pin_to_phys
-            ),
+
+SIDES = ("L", "R")
+
+
+def gen_signals_pcf(pin_config):
+    return ((s, pin_config.logical_pin_to_phys[p]) for s, p in pin_config.signals)
+
+
+def side_pin_table(pin_config, side):
+    if side == "L":
+        return pin_config.left_pin_to_phys
+    return pin_config.right_pin_to_phys
+
+
+# stacks gives the stack fitted to each of the sides, or is None to generate
+# every breakout on every side
+def gen_pcf(pin_config, sides=SIDES, stacks=None):
+    yield gen_signals_pcf(pin_config)
+
+    for i, side in enumerate(sides):
+        if side not in board_sides(pin_config):
+            continue
+
+        stack = None if stacks is None else stacks[i]
+        yield from gen_side_pcf(side, side_pin_table(pin_config, side), stack)
+
+
+# Each section is formatted into a single string so that output happens in a
+# handful of large writes rather than a write per set_io line.
+def pcf_section(section):
+    return "".join(f"set_io {name} {pin}\n" for name, pin in section) + "\n"
+
+
+def pcf_chunks(sections):
+    return (pcf_section(s) for s in sections)
+
+
+WRITE_BUFFER_SIZE = 1 << 16
+
+
+# Write to a temp file in the destination directory and then rename it over
+# the destination, so that concurrent readers (e.g. parallel builds) only
+# ever see the old file or the complete new one.
+def atomic_write(path, chunks, mode="w"):
+    requested = path
+    path = os.path.abspath(path)
+    # a failure to create the temp file, e.g. because the directory doesn't
+    # exist, is reported against the path that was asked for
+    try:
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path),
+            prefix=f".{os.path.basename(path)}.",
+            suffix=".tmp",
+        )
+    except OSError as e:
+        raise OSError(e.errno, e.strerror, requested) from None
+    try:
+        with os.fdopen(fd, mode, buffering=WRITE_BUFFER_SIZE) as f:
+            for chunk in chunks:
+                f.write(chunk)
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_path, 0o666 & ~umask)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def write_output(chunks, output=None):
+    if output is None:
+        for chunk in chunks:
+            sys.stdout.write(chunk)
+    else:
+        atomic_write(output, chunks)
+
+
+# The sdc constrains the core board's CLK, the clocks that fitted breakouts
+# drive into the ice40, and the input and output delays of the breakouts'
+# groups and signals relative to those clocks. A delay that is longer than a
+# clock period needs a multicycle path in the design.
+DEFAULT_CLOCK_PERIOD = 10
+
+
+def sdc_number(ns):
+    return f"{round(ns, 3):g}"
+
+
+def sdc_ports(names):
+    if len(names) == 1 and "[" not in names[0]:
+        return f"[get_ports {names[0]}]"
+    return "[get_ports {" + " ".join(names) + "}]"
+
+
+# Port names of each of a breakout's groups and signals on a side, e.g.
+# R_SRAM_ADDR_BUS[0], leaving out the pins that don't reach the ice40. With
+# ports only the names in the design are included, which may be the _01
+# style aliases.
+def breakout_port_names(side, breakout, table, ports=None):
+    names = {}
+    for groups, signals in breakout.breakouts:
+        for label, grp in groups:
+            names[label] = []
+            for i, p in enumerate(grp):
+                if table[base_pin_numbers[p]] is None:
+                    continue
+                candidates = [f"{side}_{label}[{i}]"]
+                if ports is not None and breakout.pin_aliases:
+                    candidates.append(f"{side}_{label}_{i+1:02}")
+                names[label] += [n for n in candidates if ports is None or n in ports]
+        for label, p in signals:
+            name = f"{side}_{label}"
+            reachable = table[base_pin_numbers[p]] is not None
+            names[label] = (
+                [name] if reachable and (ports is None or name in ports) else []
+            )
+    for label, pairs in breakout.diff_pairs:
+        names[label] = [
+            f"{side}_{label}[{i}]"
+            for i, pair in enumerate(pairs)
+            if all(table[base_pin_numbers[p]] is not None for p in pair)
+            and (ports is None or f"{side}_{label}[{i}]" in ports)
+        ]
+    return names
+
+
+def gen_breakout_sdc(side, breakout, table, clocks, ports=None):
+    names = breakout_port_names(side, breakout, table, ports)
+    for signal, period in breakout.clocks:
+        for name in names[signal]:
+            clocks.add(name)
+            yield f"create_clock -name {name} -period {sdc_number(period)} {sdc_ports([name])}"
+
+    for direction, clock, min_delay, max_delay, labels in breakout.delays:
+        clock = "CLK" if clock is None else f"{side}_{clock}"
+        targets = [name for label in labels for name in names[label]]
+        if clock not in clocks or not targets:
+            continue
+        for limit, delay in (("max", max_delay), ("min", min_delay)):
+            yield (
+                f"set_{direction}_delay -clock {clock} -{limit} "
+                f"{sdc_number(delay)} {sdc_ports(targets)}"
+            )
+
+
+# The sdc as sections of lines, for the same sides and stacks as gen_pcf.
+def gen_sdc(
+    pin_config, sides=SIDES, stacks=None, clock_period=DEFAULT_CLOCK_PERIOD, ports=None
+):
+    clocks = set()
+    if ports is None or "CLK" in ports:
+        clocks.add("CLK")
+        yield [
+            f"create_clock -name CLK -period {sdc_number(clock_period)} "
+            f"{sdc_ports(['CLK'])}"
+        ]
+
+    for i, side in enumerate(sides):
+        if side not in board_sides(pin_config):
+            continue
+
+        stack = None if stacks is None else stacks[i]
+        for breakout, table in side_breakouts(side_pin_table(pin_config, side), stack):
+            yield list(gen_breakout_sdc(side, breakout, table, clocks, ports))
+
+
+def sdc_text(sections):
+    return "\n".join("".join(f"{line}\n" for line in s) for s in sections if s)
+
+
+# Core boards are defined by the modules in boards/, e.g. boards/hx8k.py for
+# the hx8k. They are found by name, and a board's module is only imported,
+# and its config built, the first time the board is used, so the cost of
+# starting pins.py doesn't grow with the number of boards.
+BOARDS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "boards")
+
+
+def board_config(module):
+    return IcePinConfig(
+        module.logical_pin_to_phys,
+        module.signals,
+        module.left_pin_to_logical,
+        module.right_pin_to_logical,
+        module.package,
+    )
+
+
+class BoardRegistry(collections.abc.Mapping):
+    def __init__(self, directory):
+        self.directory = directory
+        self.configs = {}
+
+    @functools.cached_property
+    def names(self):
+        return sorted(
+            name[:-3]
+            for name in os.listdir(self.directory)
+            if name.endswith(".py") and not name.startswith("_")
+        )
+
+    def __getitem__(self, name):
+        if name not in self.configs:
+            if name not in self.names:
+                raise KeyError(name)
+            module = importlib.import_module(f"boards.{name}")
+            self.configs[name] = board_config(module)
+        return self.configs[name]
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+
+boards = BoardRegistry(BOARDS_DIR)
+
+
+# Cache of generated pcf files, keyed by a hash of everything that goes into
+# them: the resolved pin config, the group tables and the generator itself.
+# Entries are named <variant>-<key>.pcf. Storing an entry evicts any other
+# entry for the same variant, since those can only be stale, and the oldest
+# entries overall are evicted once there are more than CACHE_MAX_ENTRIES.
+CACHE_MAX_ENTRIES = 256
+
+
+# The directory the scripts keep their caches in, e.g. the pcf cache and
+# pcbdb.py's database.
+def cache_root():
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(cache_home, "vanilla-ice40")
+
+
+def default_cache_dir():
+    return os.path.join(cache_root(), "pcf")
+
+
+# Any change to the generator is treated as a new generator version.
+def generator_version():
+    with open(__file__, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def cache_key(pin_config, variant):
+    config = (
+        sorted(pin_config.logical_pin_to_phys.items()),
+        pin_config.signals,
+        sorted((pin_config.left_pin_to_logical or {}).items()),
+        sorted((pin_config.right_pin_to_logical or {}).items()),
+    )
+    breakouts = [load_breakout(name) for name in sorted(variant_breakouts(variant))]
+    inputs = (generator_version(), variant, config, peripheral_groups, breakouts)
+    return hashlib.sha256(repr(inputs).encode()).hexdigest()
+
+
+def cache_path(cache_dir, variant, key):
+    return os.path.join(cache_dir, f"{variant}-{key}.pcf")
+
+
+def cache_lookup(cache_dir, variant, key):
+    path = cache_path(cache_dir, variant, key)
+    try:
+        with open(path) as f:
+            text = f.read()
+        os.utime(path)
+    except OSError:
+        return None
+    return text
+
+
+# Other processes may be generating into the same cache, so entries can
+# vanish at any point while evicting.
+def cache_evict(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def cache_mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except FileNotFoundError:
+        return 0
+
+
+def cache_store(cache_dir, variant, key, text):
+    path = cache_path(cache_dir, variant, key)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        atomic_write(path, [text])
+
+        entries = []
+        for name in os.listdir(cache_dir):
+            entry_variant, _, entry_key = name.rpartition("-")
+            if not entry_key.endswith(".pcf"):
+                continue
+
+            entry = os.path.join(cache_dir, name)
+            if entry_variant == variant and entry != path:
+                cache_evict(entry)
+            else:
+                entries.append(entry)
+
+        entries.sort(key=cache_mtime)
+        for old in entries[:-CACHE_MAX_ENTRIES]:
+            cache_evict(old)
+    except OSError as e:
+        print(f"warning: unable to update pcf cache: {e}", file=sys.stderr)
+
+
+def output_matches(output, text):
+    try:
+        with open(output, "rb" if isinstance(text, bytes) else "r") as f:
+            return f.read() == text
+    except OSError:
+        return False
+
+
+# the connector sides a board actually has
+def board_sides(pin_config):
+    return tuple(
+        side
+        for side, io_dict in zip(
+            SIDES, (pin_config.left_pin_to_logical, pin_config.right_pin_to_logical)
         )
-        for l, g in peripheral_groups
+        if io_dict
+    )
+
+
+# A single pcf to generate: a core board, the connector sides to include
+# and the stack of boards fitted to each of those sides. Without stacks every
+# breakout is generated on each side.
+@dataclass(frozen=True)
+class Variant:
+    board: str
+    sides: tuple = SIDES
+    stacks: tuple = None
+
+    @property
+    def name(self):
+        stacks = self.stacks or ((),) * len(self.sides)
+        name = self.board + "".join(
+            f"-{side}_{'+'.join(stack)}" if stack else f"-{side}"
+            for side, stack in zip(self.sides, stacks)
+        )
+        if self.stacks is None:
+            name += "-all"
+        return name
+
+
+def variant_breakouts(variant):
+    if variant.stacks is None:
+        return set(breakout_modules)
+    return {name for stack in variant.stacks for name in stack}
+
+
+MAX_STACK_DEPTH = 3
+
+
+# every valid stack of distinct boards, up to max_depth boards high
+def all_stacks(max_depth=MAX_STACK_DEPTH):
+    stacks = []
+    for depth in range(1, max_depth + 1):
+        for stack in itertools.permutations(breakout_modules, depth):
+            try:
+                check_stack(stack)
+            except ValueError:
+                continue
+            stacks.append(stack)
+    return stacks
+
+
+# Every variant of every board: every breakout on every side, and each side
+# alone with nothing fitted and with every stack.
+def all_variants(max_depth=MAX_STACK_DEPTH):
+    stacks = [()] + all_stacks(max_depth)
+    variants = []
+    for board_name, pin_config in boards.items():
+        variants.append(Variant(board_name, board_sides(pin_config)))
+        for side in board_sides(pin_config):
+            variants.extend(Variant(board_name, (side,), (s,)) for s in stacks)
+    return variants
+
+
+# The verifier below represents the balls in use by a configuration as a
+# ball set: an int with a bit per ball of the package, in the order of
+# package_balls. Checking a board against another is then a single and.
+
+
+# the bga's rows skip I, O, Q and S
+BGA_ROWS = "ABCDEFGHJKLMNPRT"
+
+package_balls = {
+    "CT256": tuple(f"{row}{col}" for row in BGA_ROWS for col in range(1, 17)),
+    "TQ144": tuple(str(pin) for pin in range(1, 145)),
+}
+
+# The balls of each package's global buffer inputs. A clock on any other
+# ball reaches the global network through general routing, with far more
+# skew.
+gbin_balls = {
+    "CT256": {
+        "F7": "GBIN0",
+        "C8": "GBIN1",
+        "H16": "GBIN2",
+        "H11": "GBIN3",
+        "K9": "GBIN4",
+        "R9": "GBIN5",
+        "J3": "GBIN6",
+        "G1": "GBIN7",
+    },
+    "TQ144": {
+        "129": "GBIN0",
+        "128": "GBIN1",
+        "94": "GBIN2",
+        "93": "GBIN3",
+        "52": "GBIN4",
+        "49": "GBIN5",
+        "21": "GBIN6",
+        "20": "GBIN7",
+    },
+}
+
+# on board signals that are clocks, as in the sdc
+BOARD_CLOCKS = ("CLK",)
+
+
+@functools.lru_cache(maxsize=None)
+def ball_bits(package):
+    return {ball: 1 << i for i, ball in enumerate(package_balls[package])}
+
+
+def iter_balls(balls):
+    while balls:
+        low = balls & -balls
+        yield low
+        balls ^= low
+
+
+def ball_set_names(package, balls):
+    names = package_balls[package]
+    return [names[bit.bit_length() - 1] for bit in iter_balls(balls)]
+
+
+# Add the (name, ball) pairs in claims to a ball set, where owners records
+# the name on each ball. Returns the new ball set and a problem for each
+# ball that is already claimed.
+def claim_balls(balls, owners, claims, bits):
+    problems = []
+    for name, ball in claims:
+        bit = bits[ball]
+        if balls & bit:
+            problems.append(f"{name} and {owners[bit]} are both on {ball}")
+        else:
+            balls |= bit
+            owners[bit] = name
+    return balls, problems
+
+
+# Check a core board's own tables: that every ball exists and is only used
+# once, that every connector pin reaches the ice40 and is in a peripheral
+# group, and that the on board signals and the connectors don't share balls.
+# Returns the problems, the ball set of the signals for checking breakouts
+# against, and the ball set of the io balls that nothing is wired to.
+@functools.lru_cache(maxsize=None)
+def verify_board(board_name):
+    pin_config = boards[board_name]
+    bits = ball_bits(pin_config.package)
+    problems = []
+
+    logical_owners = {}
+    io_balls = 0
+    for logical, ball in pin_config.logical_pin_to_phys.items():
+        bit = bits.get(ball)
+        if bit is None:
+            problems.append(f"{logical} is on {ball}, which {pin_config.package} lacks")
+        elif bit in logical_owners:
+            problems.append(f"{logical} and {logical_owners[bit]} are both on {ball}")
+        else:
+            logical_owners[bit] = logical
+            if logical.startswith("IO"):
+                io_balls |= bit
+    if problems:
+        return tuple(f"{board_name}: {p}" for p in problems), 0, 0
+
+    signal_claims = []
+    for signal, logical in pin_config.signals:
+        if logical in pin_config.logical_pin_to_phys:
+            signal_claims.append((signal, pin_config.logical_pin_to_phys[logical]))
+        else:
+            problems.append(f"{signal} is on {logical}, which has no ball")
+    owners = {}
+    used, claim_problems = claim_balls(0, owners, signal_claims, bits)
+    problems += claim_problems
+    signal_balls = used
+
+    grouped = set(base_pin_numbers.values())
+    for side in board_sides(pin_config):
+        io_dict = (
+            pin_config.left_pin_to_logical
+            if side == "L"
+            else pin_config.right_pin_to_logical
+        )
+        for pin, logical in sorted(io_dict.items()):
+            if logical not in pin_config.logical_pin_to_phys:
+                problems.append(
+                    f"{side} connector pin {pin} is on {logical}, which has no ball"
+                )
+
+        pin_table = side_pin_table(pin_config, side)
+        claims = []
+        for pin in range(1, B2B_PINS + 1):
+            ball = pin_table[pin]
+            if ball is None:
+                if pin in grouped:
+                    problems.append(
+                        f"{side} peripheral pin {pin} doesn't reach the ice40"
+                    )
+            elif pin not in grouped:
+                problems.append(
+                    f"{side} peripheral pin {pin} is on {ball} but isn't in a "
+                    "peripheral group"
+                )
+            else:
+                claims.append((f"{side} peripheral pin {pin}", ball))
+        used, claim_problems = claim_balls(used, owners, claims, bits)
+        problems += claim_problems
+
+    problems = tuple(f"{board_name}: {p}" for p in problems)
+    return problems, signal_balls, io_balls & ~used
+
+
+# Check a stack of boards fitted to a side: that no two boards, or a board
+# and the on board signals, claim the same ball.
+def verify_stack(board_name, side, stack):
+    pin_config = boards[board_name]
+    bits = ball_bits(pin_config.package)
+    _, signal_balls, _ = verify_board(board_name)
+
+    balls = signal_balls
+    owners = {}
+    for signal, logical in pin_config.signals:
+        owners[bits[pin_config.logical_pin_to_phys[logical]]] = signal
+
+    pin_table = side_pin_table(pin_config, side)
+    problems = []
+    for depth, name in enumerate(stack):
+        breakout = load_breakout(name)
+        perm = stack_permutation(stack[:depth])
+
+        # the ball each of the board's base group pins lands on, if any
+        def stack_ball(p, perm=perm):
+            pin = perm[base_pin_numbers[p]]
+            return None if pin is None else pin_table[pin]
+
+        claims = []
+        for groups, signals in breakout.breakouts:
+            claims += [
+                (f"{label}[{i}]", p) for label, grp in groups for i, p in enumerate(grp)
+            ] + list(signals)
+        for label, pairs in breakout.diff_pairs:
+            for i, (p, n) in enumerate(pairs):
+                claims += [(f"{label}[{i}]", p), (f"{label}[{i}] complement", n)]
+                true_ball, complement = stack_ball(p), stack_ball(n)
+                if true_ball is None or complement is None:
+                    continue
+                if pin_config.lvds_pairs.get(true_ball) != complement:
+                    problems.append(
+                        f"{name} {label}[{i}] is on {true_ball} and {complement}, "
+                        "which aren't a differential pair"
+                    )
+
+        # a board may name a ball more than once, e.g. the pmod's PMOD array
+        # aliases each PMOD_x group, so only other boards' balls conflict
+        board_balls = 0
+        names = {}
+        for label, p in claims:
+            ball = stack_ball(p)
+            if ball is not None:
+                bit = bits[ball]
+                board_balls |= bit
+                names.setdefault(bit, f"{name} {label}")
+
+        for bit in iter_balls(board_balls & balls):
+            ball = package_balls[pin_config.package][bit.bit_length() - 1]
+            problems.append(f"{names[bit]} and {owners[bit]} are both on {ball}")
+        for bit in iter_balls(board_balls & ~balls):
+            owners[bit] = names[bit]
+        balls |= board_balls
+
+    stack_name = "+".join(stack) or "nothing"
+    return [f"{board_name} {side} with {stack_name}: {p}" for p in problems]
+
+
+# The stacks that make up a variant on each side. Without stacks, every
+# breakout is checked as if it alone were fitted to the core board.
+def variant_stacks(variant):
+    sides = [s for s in variant.sides if s in board_sides(boards[variant.board])]
+    if variant.stacks is None:
+        return [(side, (name,)) for side in sides for name in breakout_modules]
+    return [
+        (side, stack)
+        for side, stack in zip(variant.sides, variant.stacks)
+        if side in sides
     ]
-    gen_pcf_from_groups("L", ice_groups)
 
 
-def gen_right_pcf(pin_config):
-    ice_groups = [
-        (
-            l,
-            peripheral_group_to_ice_group(
-                g, pin_config.right_pin_to_logical, pin_config.logical_pin_to_phys
-            ),
+def verify_variant(variant):
+    problems = list(verify_board(variant.board)[0])
+    if not problems:
+        for side, stack in variant_stacks(variant):
+            problems += verify_stack(variant.board, side, stack)
+    if problems:
+        raise ValueError("\n".join(problems))
+
+
+# Pins 1-60 and 61-120 are the connector's two rows, facing each other.
+def connector_distance(a, b):
+    return abs((a - 1) % 60 - (b - 1) % 60) + ((a - 1) // 60 != (b - 1) // 60)
+
+
+# Check that a board's on board clocks land on global buffer inputs.
+def verify_board_clocks(board_name):
+    pin_config = boards[board_name]
+    gbins = gbin_balls[pin_config.package]
+    problems = []
+    for signal, logical in pin_config.signals:
+        ball = pin_config.logical_pin_to_phys.get(logical)
+        if signal in BOARD_CLOCKS and ball is not None and ball not in gbins:
+            problems.append(
+                f"{board_name}: {signal} is on {ball}, which isn't a global "
+                "buffer input"
+            )
+    return problems
+
+
+# Check that the clocks of a stack's boards land on global buffer inputs.
+# For each that doesn't, suggest the nearest base group pin on the board's
+# connector that reaches a global buffer input nothing else uses.
+def verify_clocks(board_name, side, stack):
+    pin_config = boards[board_name]
+    gbins = gbin_balls[pin_config.package]
+    pin_table = side_pin_table(pin_config, side)
+
+    used = {
+        pin_config.logical_pin_to_phys[logical] for _, logical in pin_config.signals
+    }
+    clocks = []
+    for depth, name in enumerate(stack):
+        breakout = load_breakout(name)
+        perm = stack_permutation(stack[:depth])
+        for _, pin in breakout_pins(breakout):
+            if perm[pin] is not None:
+                used.add(pin_table[perm[pin]])
+
+        signals = dict(
+            s for _, device_signals in breakout.breakouts for s in device_signals
         )
-        for l, g in peripheral_groups
+        clocks += [
+            (name, signal, signals[signal], perm) for signal, _ in breakout.clocks
+        ]
+
+    problems = []
+    for name, signal, base, perm in clocks:
+        pin = base_pin_numbers[base]
+        ball = None if perm[pin] is None else pin_table[perm[pin]]
+        if ball is None or ball in gbins:
+            continue
+
+        free = [
+            (candidate, p)
+            for candidate, p in base_pin_numbers.items()
+            if perm[p] is not None
+            and pin_table[perm[p]] in gbins
+            and pin_table[perm[p]] not in used
+        ]
+        problem = f"{name} {signal} is on {ball}, which isn't a global buffer input"
+        if free:
+            candidate, p = min(free, key=lambda c: connector_distance(c[1], pin))
+            gbin = gbins[pin_table[perm[p]]]
+            problem += f", the nearest free one is {candidate} (pin {p}, {gbin})"
+        else:
+            problem += ", and none are free"
+        problems.append(problem)
+
+    stack_name = "+".join(stack) or "nothing"
+    return [f"{board_name} {side} with {stack_name}: {p}" for p in problems]
+
+
+# Verify every stack, up to max_depth boards high, on every side of the
+# given boards. Reports the problems and the ice40 io balls that nothing
+# uses, returning whether all the boards are ok.
+def verify_all(board_names, max_depth=MAX_STACK_DEPTH):
+    stacks = [()] + all_stacks(max_depth)
+    ok = True
+    for board_name in board_names:
+        pin_config = boards[board_name]
+        problems, _, unused = verify_board(board_name)
+        problems = list(problems)
+        clock_problems = verify_board_clocks(board_name)
+        count = 0
+        if not problems:
+            for side in board_sides(pin_config):
+                for stack in stacks:
+                    problems += verify_stack(board_name, side, stack)
+                    clock_problems += verify_clocks(board_name, side, stack)
+                    count += 1
+
+        if problems:
+            print(f"{board_name}: {len(problems)} problems")
+        else:
+            print(f"{board_name}: ok ({count} configurations)")
+        for problem in problems:
+            print(f"  {problem}")
+        if clock_problems:
+            print(f"  {len(clock_problems)} clocks off the global buffers:")
+        for problem in clock_problems:
+            print(f"    {problem}")
+        unused = ball_set_names(pin_config.package, unused)
+        if unused:
+            print(f"  {len(unused)} unused io balls: {', '.join(unused)}")
+        ok = ok and not problems
+    return ok
+
+
+# The differential pairs each side of a board brings out, as (true,
+# complement) base group pins, e.g. ("A[7]", "E[3]"), in base group order.
+def board_pairs(board_name):
+    pin_config = boards[board_name]
+    pairs = {}
+    for side in board_sides(pin_config):
+        table = side_pin_table(pin_config, side)
+        by_ball = {
+            table[p]: name
+            for name, p in base_pin_numbers.items()
+            if table[p] is not None
+        }
+        pairs[side] = [
+            (name, by_ball[pin_config.lvds_pairs[table[p]]])
+            for name, p in base_pin_numbers.items()
+            if pin_config.lvds_pairs.get(table[p]) in by_ball
+        ]
+    return pairs
+
+
+# Report the differential pairs on each side of the given boards, and the
+# peripheral groups that have both pins of a pair, for a breakout's
+# diff_pairs to use.
+def report_pairs(board_names):
+    for board_name in board_names:
+        pin_config = boards[board_name]
+        for side, pairs in board_pairs(board_name).items():
+            table = side_pin_table(pin_config, side)
+            print(f"{board_name} {side}: {len(pairs)} differential pairs")
+            for true, complement in pairs:
+                balls = [table[base_pin_numbers[p]] for p in (true, complement)]
+                print(f"  {true:<5} {complement:<5} {balls[0]:>4} {balls[1]:>4}")
+
+            within = collections.Counter(
+                true.partition("[")[0]
+                for true, complement in pairs
+                if true.partition("[")[0] == complement.partition("[")[0]
+            )
+            groups = [
+                f"{label} {within[label]}"
+                for label, _ in peripheral_groups
+                if within[label]
+            ]
+            print(f"  pairs within a group: {', '.join(groups) or 'none'}")
+
+
+# The top level port names of a yosys json netlist, as they are named in a
+# pcf: the bits of a bus are name[i] and single bit ports are just name.
+def read_netlist_ports(path, top=None):
+    with open(path) as f:
+        modules = json.load(f)["modules"]
+
+    if top is None:
+        tops = [
+            name
+            for name, module in modules.items()
+            if int(module.get("attributes", {}).get("top", "0"), 2)
+        ]
+        if len(tops) != 1:
+            raise ValueError(f"{path}: can't tell which module is the top, use --top")
+        top = tops[0]
+    elif top not in modules:
+        raise ValueError(f"{path}: no module named '{top}'")
+
+    ports = set()
+    for name, port in modules[top]["ports"].items():
+        width = len(port["bits"])
+        offset = port.get("offset", 0)
+        if width == 1 and offset == 0:
+            ports.add(name)
+        elif port.get("upto", 0):
+            ports.update(f"{name}[{offset + width - 1 - i}]" for i in range(width))
+        else:
+            ports.update(f"{name}[{offset + i}]" for i in range(width))
+    return ports
+
+
+# Read a pcf back into sections of (name, pin) pairs.
+def parse_pcf(text):
+    sections = []
+    section = []
+    for line in text.splitlines():
+        fields = line.split()
+        if fields and fields[0] == "set_io":
+            section.append((fields[-2], fields[-1]))
+        elif not fields and section:
+            sections.append(section)
+            section = []
+    if section:
+        sections.append(section)
+    return sections
+
+
+# Keep only the pins for ports in the design, and complain about any port
+# that isn't constrained.
+def prune_sections(sections, ports):
+    pruned = []
+    matched = set()
+    for section in sections:
+        section = [(name, pin) for name, pin in section if name in ports]
+        matched.update(name for name, _ in section)
+        if section:
+            pruned.append(section)
+
+    unmatched = ports - matched
+    if unmatched:
+        raise ValueError(
+            "no constraint for port"
+            + ("s " if len(unmatched) > 1 else " ")
+            + ", ".join(sorted(unmatched))
+        )
+    return pruned
+
+
+# Comparing a pcf against a golden copy, e.g. one of the checked in
+# constraint files, is done by section: the on board signals, each side's
+# base groups and each device on a breakout. Every pin is put in its section
+# by its name and each section is hashed, so only sections whose hashes
+# differ need to be diffed pin by pin.
+
+# a group or signal label followed by the _01 or [0] style index of a pin
+PIN_NAME_RE = re.compile(r"(.*?)(?:_\d+|\[\d+\])?$")
+
+
+# The section each group and signal label belongs to, e.g. A is in base and
+# SRAM_256_B_DATA_BUS is in sram-256x2 b. Devices are lettered on breakouts
+# that have more than one.
+@functools.lru_cache(maxsize=None)
+def section_labels():
+    labels = {label: "base" for label, _ in peripheral_groups}
+    for name in breakout_modules:
+        devices = load_breakout(name).breakouts
+        for i, (groups, signals) in enumerate(devices):
+            section = name if len(devices) == 1 else f"{name} {chr(ord('a') + i)}"
+            for label, _ in list(groups) + list(signals):
+                labels[label] = section
+        for label, _ in load_breakout(name).diff_pairs:
+            labels[label] = name
+    return labels
+
+
+def pin_section(name):
+    side, sep, rest = name.partition("_")
+    if not sep or side not in SIDES:
+        return "signals"
+    label = PIN_NAME_RE.match(rest).group(1)
+    return f"{side} {section_labels().get(label, 'other')}"
+
+
+# sections of a pcf's text, in order, of (hash, pins)
+def pcf_section_hashes(text):
+    pins = [pin for section in parse_pcf(text) for pin in section]
+    return {
+        section: (pins_fingerprint(section_pins), section_pins)
+        for section, section_pins in pins_by_section(pins).items()
+    }
+
+
+# (name, pin) pairs grouped by their section, in order
+def pins_by_section(pins):
+    sections = collections.defaultdict(list)
+    for name, pin in pins:
+        sections[pin_section(name)].append((name, pin))
+    return sections
+
+
+# A fingerprint of (name, pin) pairs, which only depends on the names and
+# pins and their order, not on how they are split into sections.
+def pins_fingerprint(pins):
+    return hashlib.sha256(
+        "".join(f"{name} {pin}\n" for name, pin in pins).encode()
+    ).hexdigest()
+
+
+# A line for each section of text that differs from golden, followed by the
+# pins that differ in it.
+def compare_pcf(text, golden):
+    hashes = pcf_section_hashes(text)
+    golden_hashes = pcf_section_hashes(golden)
+
+    lines = []
+    for section in list(golden_hashes) + [s for s in hashes if s not in golden_hashes]:
+        digest, pins = hashes.get(section, (None, []))
+        golden_digest, golden_pins = golden_hashes.get(section, (None, []))
+        if digest == golden_digest:
+            continue
+
+        pin_dict = dict(pins)
+        golden_dict = dict(golden_pins)
+        diff = []
+        for name, pin in golden_pins:
+            if name not in pin_dict:
+                diff.append(f"  - {name} {pin}")
+            elif pin_dict[name] != pin:
+                diff.append(f"  ~ {name} {pin} -> {pin_dict[name]}")
+        diff += [f"  + {name} {pin}" for name, pin in pins if name not in golden_dict]
+
+        if not diff:
+            lines.append(f"{section}: same pins in a different order")
+        else:
+            pins_differ = "pin differs" if len(diff) == 1 else "pins differ"
+            lines.append(f"{section}: {len(diff)} {pins_differ}")
+            lines += diff
+    return lines
+
+
+# The pins of a variant as the pcf's sections of (name, pin) pairs, which
+# are what the pcf and the other outputs below are all emitted from, so a
+# variant is only resolved once however many of them are written. With
+# ports only the pins for ports in the design are kept.
+def variant_sections(variant, ports=None):
+    verify_variant(variant)
+    pin_config = boards[variant.board]
+    sections = [list(s) for s in gen_pcf(pin_config, variant.sides, variant.stacks)]
+    if ports is not None:
+        sections = prune_sections(sections, ports)
+    return sections
+
+
+# an array pin, e.g. R_SRAM_DATA_BUS[3]
+BUS_PIN_RE = re.compile(r"(.*)\[(\d+)\]$")
+
+
+# The width of each array in the sections, e.g. R_SRAM_DATA_BUS is 16 bits.
+# Pins that don't reach the ice40 are left out of an array but still count
+# towards its width.
+def bus_widths(sections):
+    widths = {}
+    for section in sections:
+        for name, _ in section:
+            m = BUS_PIN_RE.match(name)
+            if m:
+                widths[m[1]] = max(widths.get(m[1], 0), int(m[2]) + 1)
+    return widths
+
+
+def pcf_output_text(variant, sections):
+    return "".join(pcf_chunks(sections))
+
+
+# Every pin with its ball and the ice40's logical name for the ball, and the
+# width of every array, for scripts that would otherwise parse the pcf.
+def json_output_text(variant, sections):
+    pin_config = boards[variant.board]
+    logical = {ball: name for name, ball in pin_config.logical_pin_to_phys.items()}
+    doc = {
+        "board": variant.board,
+        "package": pin_config.package,
+        "variant": variant.name,
+        "pins": {
+            name: {"ball": ball, "logical": logical.get(ball)}
+            for section in sections
+            for name, ball in section
+        },
+        "buses": bus_widths(sections),
+    }
+    return json.dumps(doc, indent=2) + "\n"
+
+
+def csv_output_text(variant, sections):
+    pin_config = boards[variant.board]
+    logical = {ball: name for name, ball in pin_config.logical_pin_to_phys.items()}
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(["name", "ball", "logical", "bus", "bit"])
+    for section in sections:
+        for name, ball in section:
+            m = BUS_PIN_RE.match(name)
+            bus, bit = (m[1], m[2]) if m else ("", "")
+            writer.writerow([name, ball, logical.get(ball, ""), bus, bit])
+    return out.getvalue()
+
+
+# The width of each array as a verilog define, e.g. R_SRAM_DATA_BUS_WIDTH,
+# for sizing the ports of a design's top module.
+def verilog_header_output_text(variant, sections):
+    lines = [
+        f"// pin array widths for {variant.name}, generated by pins.py",
+        "`ifndef VANILLA_ICE40_PINS_VH",
+        "`define VANILLA_ICE40_PINS_VH",
+        "",
     ]
-    gen_pcf_from_groups("R", ice_groups)
+    lines += [f"`define {bus}_WIDTH {w}" for bus, w in bus_widths(sections).items()]
+    lines += ["", "`endif"]
+    return "".join(f"{line}\n" for line in lines)
 
 
-def gen_pcf(pin_config):
-    for s, p in pin_config.signals:
-        print(f"set_io {s} {pin_config.logical_pin_to_phys[p]}")
-    print()
+# The same widths as localparams of a systemverilog package.
+def sv_package_output_text(variant, sections):
+    lines = [
+        f"// pin array widths for {variant.name}, generated by pins.py",
+        "package vanilla_ice40_pins_pkg;",
+    ]
+    lines += [
+        f"  localparam int {bus}_WIDTH = {w};"
+        for bus, w in bus_widths(sections).items()
+    ]
+    lines.append("endpackage")
+    return "".join(f"{line}\n" for line in lines)
+
+
+# the ice40's banks, by the prefix of the logical pin names
+LOGICAL_BANKS = {"IOT": 0, "IOR": 1, "IOB": 2, "IOL": 3}
+
+# a group pin's _01 style alias
+ALIAS_PIN_RE = re.compile(r"(.*)_(\d+)$")
+
+
+# The side, group and bit of a pin's name, e.g. R_SRAM_DATA_BUS[3] and its
+# alias R_SRAM_DATA_BUS_04 are both bit 3 of SRAM_DATA_BUS on R. On board
+# signals have no side, and the group of a single pin is its name with bit
+# -1.
+def pin_name_fields(name):
+    side, sep, rest = name.partition("_")
+    if not sep or side not in SIDES:
+        side, rest = None, name
+    m = BUS_PIN_RE.match(rest)
+    if m:
+        return side, m[1], int(m[2])
+    m = ALIAS_PIN_RE.match(rest)
+    if m and m[1] in section_labels():
+        return side, m[1], int(m[2]) - 1
+    return side, rest, -1
+
+
+# The pins as a binary pin map, see pinmap.py, for readers that memory map
+# it rather than resolving the variant themselves.
+def pinmap_output_bytes(variant, sections):
+    pin_config = boards[variant.board]
+    logical = {ball: name for name, ball in pin_config.logical_pin_to_phys.items()}
+    pins = []
+    for section in sections:
+        for name, ball in section:
+            side, group, bit = pin_name_fields(name)
+            logical_name = logical.get(ball, "")
+            bank = LOGICAL_BANKS.get(logical_name[:3])
+            pins.append(pinmap.Pin(name, side, group, bit, ball, bank, logical_name))
+    return pinmap.pack(pins)
+
+
+# A manifest of fingerprints for a build cache to decide whether a design's
+# place and route can be reused: a fingerprint of all the pins, one of each
+# section, as in compare_pcf, and the pin of every name. The fingerprint of
+# the pins a design uses is effective_fingerprint(manifest, ports), which is
+# the fingerprint of the manifest written with --netlist for the design.
+def manifest_output_text(variant, sections):
+    pins = [pin for section in sections for pin in section]
+    doc = {
+        "variant": variant.name,
+        "fingerprint": pins_fingerprint(pins),
+        "sections": {
+            section: pins_fingerprint(section_pins)
+            for section, section_pins in pins_by_section(pins).items()
+        },
+        "pins": dict(pins),
+    }
+    return json.dumps(doc, indent=2) + "\n"
+
+
+def effective_fingerprint(manifest, ports):
+    return pins_fingerprint(
+        (name, pin) for name, pin in manifest["pins"].items() if name in ports
+    )
 
-    if pin_config.left_pin_to_logical:
-        gen_left_pcf(pin_config)
 
-    if pin_config.right_pin_to_logical:
-        gen_right_pcf(pin_config)
+output_formats = {
+    "pcf": pcf_output_text,
+    "json": json_output_text,
+    "csv": csv_output_text,
+    "verilog-header": verilog_header_output_text,
+    "sv-package": sv_package_output_text,
+    "pinmap": pinmap_output_bytes,
+    "manifest": manifest_output_text,
+}
+
+
+# Write each of outputs, a dict of format to path, from a single resolve of
+# the variant, leaving up to date files untouched. A path of None writes to
+# stdout.
+def generate_outputs(variant, outputs, ports=None):
+    sections = variant_sections(variant, ports)
+    for fmt, path in outputs.items():
+        text = output_formats[fmt](variant, sections)
+        if path is None:
+            write_output([text])
+        else:
+            write_if_changed(path, text)
+
+
+# The files a variant's outputs, in formats, are generated from: pins.py
+# itself, which has the group tables, the modules of the core board and of
+# every breakout in the variant, and pinmap.py, which has the pin map's
+# layout, if a pin map is one of the outputs.
+def variant_inputs(variant, formats=()):
+    paths = [os.path.abspath(__file__), os.path.join(BOARDS_DIR, f"{variant.board}.py")]
+    for name in sorted(variant_breakouts(variant)):
+        load_breakout(name)
+        path = getattr(sys.modules[breakout_modules[name]], "__file__", None)
+        if path:
+            paths.append(os.path.abspath(path))
+    if "pinmap" in formats:
+        paths.append(os.path.abspath(pinmap.__file__))
+    return paths
+
+
+def depfile_escape(path):
+    return path.replace("$", "$$").replace("#", "\\#").replace(" ", "\\ ")
+
+
+# A make style depfile, which ninja also reads, with a single rule making
+# every target depend on every input.
+def depfile_text(targets, inputs):
+    rule = " ".join(depfile_escape(t) for t in targets) + ":"
+    return " \\\n  ".join([rule] + [depfile_escape(p) for p in inputs]) + "\n"
+
+
+# A variant's pins, resolved once so that build scripts and testbenches can
+# look them up in process rather than running pins.py and parsing its output:
+# the ball of every name the pcf gives, e.g. R_SRAM_DATA_BUS[3], and every
+# name on each ball, including the aliases, in pcf order.
+@dataclass(frozen=True)
+class ResolvedBoard:
+    variant: Variant
+    package: str
+    name_to_ball: dict
+    ball_to_names: dict
+    ball_to_logical: dict
+
+    def ball(self, name):
+        return self.name_to_ball[name]
+
+    def names(self, ball):
+        return self.ball_to_names.get(ball, ())
+
+    def logical(self, ball):
+        return self.ball_to_logical.get(ball)
+
+
+# The checks main() makes of the command line, for variants built in
+# process: there is a stack for each side, the board has every side that
+# something is fitted to, and each stack is valid. As with --side, a side
+# the board lacks with nothing fitted is left out.
+def check_variant(variant):
+    if variant.board not in boards:
+        raise ValueError(f"unknown board '{variant.board}'")
+    if variant.stacks is None:
+        return
+
+    if len(variant.stacks) != len(variant.sides):
+        raise ValueError(
+            f"{len(variant.stacks)} stacks for {len(variant.sides)} sides, "
+            "there has to be one for each side"
+        )
+    present = board_sides(boards[variant.board])
+    for side, stack in zip(variant.sides, variant.stacks):
+        if stack and side not in present:
+            raise ValueError(f"{variant.board} has no {side} connector")
+        try:
+            check_stack(stack)
+        except ValueError as e:
+            raise ValueError(f"{side} stack: {e}") from None
+
+
+# Resolve a variant, e.g. resolve(Variant("hx8k", ("R",), (("sram",),))),
+# raising ValueError if it is invalid, see check_variant.
+@functools.lru_cache(maxsize=None)
+def resolve(variant):
+    check_variant(variant)
+
+    pin_config = boards[variant.board]
+    name_to_ball = {}
+    ball_to_names = collections.defaultdict(list)
+    for section in variant_sections(variant):
+        for name, ball in section:
+            name_to_ball[name] = ball
+            ball_to_names[ball].append(name)
+
+    return ResolvedBoard(
+        variant,
+        pin_config.package,
+        name_to_ball,
+        {ball: tuple(names) for ball, names in ball_to_names.items()},
+        {ball: logical for logical, ball in pin_config.logical_pin_to_phys.items()},
+    )
 
 
-hx8k_config = IcePinConfig(
-    hx8k.logical_pin_to_phys,
-    hx8k.signals,
-    hx8k.left_pin_to_logical,
-    hx8k.right_pin_to_logical,
-)
+# The pcf text for a variant, through the cache if there is one.
+def pcf_text(variant, cache_dir=None, ports=None):
+    pin_config = boards[variant.board]
+    if cache_dir is None:
+        text = None
+    else:
+        key = cache_key(pin_config, variant)
+        text = cache_lookup(cache_dir, variant.name, key)
+
+    if text is None:
+        verify_variant(variant)
+        text = "".join(pcf_chunks(gen_pcf(pin_config, variant.sides, variant.stacks)))
+        if cache_dir is not None:
+            cache_store(cache_dir, variant.name, key, text)
+
+    # The cache holds the full pcf for the variant so that it is shared by
+    # every design built for it.
+    if ports is not None:
+        text = "".join(pcf_chunks(prune_sections(parse_pcf(text), ports)))
+    return text
+
+
+def generate(variant, output=None, cache_dir=None, ports=None):
+    if cache_dir is None and ports is None:
+        pin_config = boards[variant.board]
+        verify_variant(variant)
+        write_output(
+            pcf_chunks(gen_pcf(pin_config, variant.sides, variant.stacks)), output
+        )
+        return
 
-hx4k_config = IcePinConfig(
-    hx4k.logical_pin_to_phys,
-    hx4k.signals,
-    hx4k.left_pin_to_logical,
-    hx4k.right_pin_to_logical,
-)
+    text = pcf_text(variant, cache_dir, ports)
 
-boards = {"hx4k": hx4k_config, "hx8k": hx8k_config}
+    # leave an up to date output untouched so that its mtime doesn't trigger
+    # downstream rebuilds
+    if output is None or not output_matches(output, text):
+        write_output([text], output)
 
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: pins.py <board_name>")
-        sys.exit(1)
+def generate_sdc(variant, output, clock_period=DEFAULT_CLOCK_PERIOD, ports=None):
+    pin_config = boards[variant.board]
+    text = sdc_text(
+        gen_sdc(pin_config, variant.sides, variant.stacks, clock_period, ports)
+    )
+    if not output_matches(output, text):
+        atomic_write(output, [text])
+
+
+# Compare the pcf for a variant against an existing output rather than
+# writing it, returning the differences.
+def check_output(variant, output, cache_dir=None, ports=None):
+    text = pcf_text(variant, cache_dir, ports)
+    try:
+        with open(output) as f:
+            golden = f.read()
+    except FileNotFoundError:
+        return [f"{output} doesn't exist"]
+    return compare_pcf(text, golden)
+
+
+def generate_timed(variant, output, cache_dir, check=False):
+    start = time.perf_counter()
+    differences = []
+    if check:
+        differences = check_output(variant, output, cache_dir)
+    else:
+        generate(variant, output, cache_dir)
+    return time.perf_counter() - start, differences
+
+
+# Generate, or with check compare against, the pcf for each variant in
+# output_dir. Returns whether every output matched.
+def generate_all(variants, output_dir, cache_dir, jobs=None, check=False):
+    # concurrent.futures is a quarter of the time it takes to import pins.py,
+    # and only --all needs it
+    import concurrent.futures
+
+    if not check:
+        os.makedirs(output_dir, exist_ok=True)
+    start = time.perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {
+            pool.submit(
+                generate_timed,
+                v,
+                os.path.join(output_dir, f"{v.name}.pcf"),
+                cache_dir,
+                check,
+            ): v
+            for v in variants
+        }
+        results = {
+            futures[f]: f.result() for f in concurrent.futures.as_completed(futures)
+        }
+    elapsed = time.perf_counter() - start
+
+    width = max(len(v.name) for v in variants)
+    matched = True
+    for v in variants:
+        t, differences = results[v]
+        status = ""
+        if check:
+            status = " differs" if differences else " ok"
+        print(f"{v.name:<{width}} {t * 1000:8.2f} ms{status}")
+        for line in differences:
+            print(f"  {line}")
+        matched = matched and not differences
+    print(f"{'total':<{width}} {elapsed * 1000:8.2f} ms ({len(variants)} variants)")
+    return matched
+
+
+# The pcf of a variant in parts that are each generated from their own
+# inputs, so that --watch only regenerates the parts whose inputs changed.
+# Each part is (inputs, sections): the on board signals come from the core
+# board's signals, each side's base groups from the core board's pins, and
+# each breakout on a side from its module, the modules of the boards below
+# it and the core board's pins. With old_parts, the variant's parts from
+# before the inputs in changed changed, the other parts are reused.
+def pcf_parts(variant, old_parts=None, changed=()):
+    board_module = f"boards.{variant.board}"
+    board_pins = f"{board_module}:pins"
+    pin_config = boards[variant.board]
+    parts = []
+
+    def add(inputs, gen):
+        if old_parts is not None and not inputs & changed:
+            parts.append(old_parts[len(parts)])
+        else:
+            parts.append((inputs, [list(s) for s in gen()]))
+
+    add({f"{board_module}:signals"}, lambda: [gen_signals_pcf(pin_config)])
+    for i, side in enumerate(variant.sides):
+        if side not in board_sides(pin_config):
+            continue
+
+        pin_table = side_pin_table(pin_config, side)
+        add({board_pins}, lambda: gen_base_pcf(side, pin_table))
+
+        stack = None if variant.stacks is None else variant.stacks[i]
+        for depth, (breakout, table) in enumerate(side_breakouts(pin_table, stack)):
+            below = (breakout.name,) if stack is None else stack[: depth + 1]
+            inputs = {board_pins} | {breakout_modules[name] for name in below}
+            add(inputs, lambda: gen_breakout_pcf(side, breakout, table))
+    return parts
+
+
+def clear_caches():
+    load_breakout.cache_clear()
+    board_permutation.cache_clear()
+    stack_permutation.cache_clear()
+    verify_board.cache_clear()
+    section_labels.cache_clear()
+    resolve.cache_clear()
+
+
+# Reload the board and breakout modules in paths that have been imported,
+# adding the inputs, as in pcf_parts, that changed to changed. A core
+# board's signals and pins are compared separately, so that editing only the
+# signals only regenerates them. Each module's change is recorded as soon
+# as it reloads, and the caches are cleared, even if a later module fails
+# to reload, e.g. half way through an edit, so that its output isn't left
+# stale.
+def reload_inputs(paths, changed):
+    try:
+        for path in paths:
+            reload_input(path, changed)
+    finally:
+        if changed:
+            clear_caches()
+
+
+def reload_input(path, changed):
+    directory, filename = os.path.split(path)
+    name, ext = os.path.splitext(filename)
+    module_name = f"{os.path.basename(directory)}.{name}"
+    if ext != ".py" or module_name not in sys.modules:
+        return
+
+    # the bytecode cache only notices a change to the source's mtime, to
+    # the second, or size, which a quick edit of a pin may not make
+    try:
+        os.unlink(importlib.util.cache_from_source(path))
+    except FileNotFoundError:
+        pass
+    module = importlib.reload(sys.modules[module_name])
+    if directory != BOARDS_DIR:
+        changed.add(module_name)
+        return
+
+    old = boards[name]
+    new = boards.configs[name] = board_config(module)
+    if (
+        old.logical_pin_to_phys != new.logical_pin_to_phys
+        or old.left_pin_to_logical != new.left_pin_to_logical
+        or old.right_pin_to_logical != new.right_pin_to_logical
+        or old.package != new.package
+    ):
+        changed.update({f"{module_name}:pins", f"{module_name}:signals"})
+    elif old.signals != new.signals:
+        changed.add(f"{module_name}:signals")
+
+
+def write_if_changed(path, text):
+    if output_matches(path, text):
+        return False
+    atomic_write(path, [text], "wb" if isinstance(text, bytes) else "w")
+    return True
+
+
+# Keep the outputs for a variant up to date as the board and breakout
+# modules are edited, until interrupted. outputs maps each format in
+# output_formats to its path. Edits that leave a module broken, e.g. half
+# way through an edit, are reported and the outputs are left alone until a
+# later edit fixes them. pins.py itself, e.g. its group tables, can change
+# anything, and pinmap.py the pin map's layout, so editing either restarts
+# the watch.
+def watch(variant, outputs, sdc=None, clock_period=DEFAULT_CLOCK_PERIOD, ports=None):
+    import watcher
+
+    scripts_dir = os.path.dirname(os.path.abspath(__file__))
+    directories = [scripts_dir, BOARDS_DIR, os.path.join(scripts_dir, "breakouts")]
+    parts = None
+    pending = set()
+
+    def update(reason):
+        nonlocal parts
+        verify_variant(variant)
+        new_parts = pcf_parts(variant, parts, pending)
+        regenerated = sum(
+            1
+            for i, part in enumerate(new_parts)
+            if parts is None or part is not parts[i]
+        )
+        parts = new_parts
+        pending.clear()
+
+        sections = [section for _, part in parts for section in part]
+        if ports is not None:
+            sections = prune_sections(sections, ports)
+        texts = {
+            path: output_formats[fmt](variant, sections)
+            for fmt, path in outputs.items()
+        }
+        if sdc:
+            texts[sdc] = sdc_text(
+                gen_sdc(
+                    boards[variant.board],
+                    variant.sides,
+                    variant.stacks,
+                    clock_period,
+                    ports,
+                )
+            )
+        written = [path for path, text in texts.items() if write_if_changed(path, text)]
+        print(
+            f"{time.strftime('%H:%M:%S')} {reason}: regenerated {regenerated} of "
+            f"{len(parts)} parts, wrote {', '.join(written) or 'nothing'}",
+            flush=True,
+        )
+
+    scripts = {os.path.abspath(__file__), os.path.abspath(pinmap.__file__)}
+    w = watcher.open_watcher(directories)
+    try:
+        for paths in itertools.chain([None], w.changes()):
+            restart = paths and paths & scripts
+            if restart:
+                print(
+                    f"{', '.join(sorted(map(os.path.basename, restart)))} changed, "
+                    "restarting",
+                    flush=True,
+                )
+                os.execv(sys.executable, [sys.executable] + sys.argv)
+            try:
+                if paths is None:
+                    update("start")
+                else:
+                    reload_inputs(paths, pending)
+                    if pending:
+                        update(", ".join(sorted(pending)))
+            except Exception as e:
+                print(f"error: {e}", file=sys.stderr, flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        w.close()
+
+
+def parse_stack(arg):
+    return tuple(arg.split(","))
 
-    board_name = sys.argv[1]
-    if board_name in boards:
-        gen_pcf(boards[board_name])
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate pcf files for the vanilla ice40 boards."
+    )
+    parser.add_argument("board", nargs="?", choices=boards, help="core board")
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="write to this file, atomically replacing it, rather than stdout",
+    )
+    parser.add_argument(
+        "--side",
+        choices=SIDES,
+        action="append",
+        help="only generate pins for this connector side (may be repeated)",
+    )
+    parser.add_argument(
+        "--left",
+        type=parse_stack,
+        default=(),
+        help="comma separated boards fitted to the left connector, bottom first",
+    )
+    parser.add_argument(
+        "--right",
+        type=parse_stack,
+        default=(),
+        help="comma separated boards fitted to the right connector, bottom first",
+    )
+    parser.add_argument(
+        "--all-breakouts",
+        action="store_true",
+        help="generate every breakout on every side, as if each were fitted "
+        "directly to the core board",
+    )
+    parser.add_argument(
+        "--netlist",
+        metavar="JSON",
+        help="only generate constraints for the top level ports of this yosys "
+        "json netlist",
+    )
+    parser.add_argument(
+        "--top", help="top module in the netlist, if it isn't marked as the top"
+    )
+    parser.add_argument(
+        "--all",
+        metavar="DIR",
+        help="generate every board and side variant into DIR, in parallel",
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, help="number of parallel jobs for --all"
+    )
+    parser.add_argument(
+        "--max-depth",
+        type=int,
+        default=MAX_STACK_DEPTH,
+        help="tallest stack generated by --all or checked by --verify "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--sdc",
+        metavar="PATH",
+        help="also write an sdc with the clocks and the input and output delays "
+        "of the fitted breakouts",
+    )
+    parser.add_argument(
+        "--json",
+        metavar="PATH",
+        help="also write every pin's ball and logical pin, and the width of "
+        "every array, as json",
+    )
+    parser.add_argument(
+        "--csv", metavar="PATH", help="also write a csv report of every pin"
+    )
+    parser.add_argument(
+        "--verilog-header",
+        metavar="PATH",
+        help="also write a verilog header with a _WIDTH define for every array",
+    )
+    parser.add_argument(
+        "--sv-package",
+        metavar="PATH",
+        help="also write a systemverilog package with a _WIDTH localparam for "
+        "every array",
+    )
+    parser.add_argument(
+        "--clock-period",
+        type=float,
+        default=DEFAULT_CLOCK_PERIOD,
+        help="period of the core board's CLK in the sdc, in ns "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="compare with the existing output (-o, or the files in the --all "
+        "directory) rather than writing it, and report the sections that differ",
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="check every stack, up to --max-depth, on the board (or every "
+        "board) for balls used twice, and list the io balls nothing uses",
+    )
+    parser.add_argument(
+        "--pairs",
+        action="store_true",
+        help="list the differential pairs on the board's (or every board's) "
+        "connectors",
+    )
+    parser.add_argument(
+        "--pinmap",
+        metavar="PATH",
+        help="also write a binary pin map, see pinmap.py",
+    )
+    parser.add_argument(
+        "--manifest",
+        metavar="PATH",
+        help="also write a json manifest of fingerprints of the pins and of "
+        "each section, for reusing place and route results",
+    )
+    parser.add_argument(
+        "--depfile",
+        metavar="PATH",
+        help="also write a make/ninja depfile listing the files the outputs "
+        "are generated from",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="keep the outputs up to date as the board and breakout modules "
+        "are edited, regenerating only the parts that changed",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=default_cache_dir(),
+        help="directory for cached pcf files (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="always regenerate the pcf"
+    )
+    args = parser.parse_args()
+
+    cache_dir = None if args.no_cache else args.cache_dir
+    outputs = {
+        fmt: path
+        for fmt, path in (
+            ("json", args.json),
+            ("csv", args.csv),
+            ("verilog-header", args.verilog_header),
+            ("sv-package", args.sv_package),
+            ("pinmap", args.pinmap),
+            ("manifest", args.manifest),
+        )
+        if path
+    }
+
+    if args.verify:
+        board_names = [args.board] if args.board else list(boards)
+        sys.exit(0 if verify_all(board_names, args.max_depth) else 1)
+
+    if args.pairs:
+        report_pairs([args.board] if args.board else list(boards))
+        sys.exit(0)
+
+    if args.all:
+        if (
+            args.board
+            or args.output
+            or args.side
+            or args.left
+            or args.right
+            or args.netlist
+            or args.sdc
+            or outputs
+            or args.watch
+            or args.depfile
+        ):
+            parser.error("--all can't be combined with a board or other options")
+        matched = generate_all(
+            all_variants(args.max_depth), args.all, cache_dir, args.jobs, args.check
+        )
+        sys.exit(0 if matched else 1)
+
+    if not args.board:
+        parser.error("a board is required")
+    if args.check and not args.output:
+        parser.error("--check needs the output to compare with, -o")
+    if args.watch and (args.check or not args.output):
+        parser.error("--watch needs an output to keep up to date, -o")
+    if args.depfile and (args.check or not args.output):
+        parser.error("--depfile needs an output for its rule, -o")
+
+    present = board_sides(boards[args.board])
+    requested = args.side or present
+    sides = tuple(s for s in present if s in requested)
+
+    side_stacks = dict(zip(SIDES, (args.left, args.right)))
+    for side, stack in side_stacks.items():
+        if not stack:
+            continue
+        if args.all_breakouts:
+            parser.error("--all-breakouts can't be combined with --left or --right")
+        if side not in present:
+            parser.error(f"{args.board} has no {side} connector")
+        if side not in sides:
+            parser.error(f"--side excludes the {side} connector")
+        try:
+            check_stack(stack)
+        except ValueError as e:
+            parser.error(f"{side} stack: {e}")
+
+    if args.all_breakouts:
+        variant = Variant(args.board, sides)
     else:
-        print(f"Board '{board_name}' not supported.")
+        variant = Variant(args.board, sides, tuple(side_stacks[s] for s in sides))
+
+    try:
+        ports = None
+        if args.netlist:
+            ports = read_netlist_ports(args.netlist, args.top)
+        if args.depfile:
+            targets = [args.output] + ([args.sdc] if args.sdc else [])
+            inputs = variant_inputs(variant, outputs)
+            if args.netlist:
+                inputs.append(os.path.abspath(args.netlist))
+            text = depfile_text(targets + list(outputs.values()), inputs)
+            write_if_changed(args.depfile, text)
+        if args.watch:
+            watch(
+                variant,
+                dict(outputs, pcf=args.output),
+                args.sdc,
+                args.clock_period,
+                ports,
+            )
+            return
+        if args.check:
+            differences = check_output(variant, args.output, cache_dir, ports)
+            for line in differences:
+                print(line)
+            sys.exit(1 if differences else 0)
+        # the cache only holds pcfs, so with other outputs every format is
+        # written from one resolve of the variant
+        if outputs:
+            generate_outputs(variant, dict(pcf=args.output, **outputs), ports)
+        else:
+            generate(variant, args.output, cache_dir, ports)
+        if args.sdc:
+            generate_sdc(variant, args.sdc, args.clock_period, ports)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
         sys.exit(1)
 
 
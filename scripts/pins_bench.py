@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+
+import argparse
+import gc
+import importlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+import pins
+
+# This script times each stage of generating a pcf with pins.py, for the real
+# boards and for synthetic configurations that are much larger than any real
+# one, and compares the times against a stored baseline.
+#
+# The stages are:
+#   load:    loading the core board's tables and the breakouts
+#   resolve: resolving the peripheral groups and the stack permutations
+#   format:  formatting the pcf text
+#   output:  writing the pcf to a file
+#   verify:  checking the variant's ball usage
+#
+# Each stage is run several times, with the garbage collector off as timeit
+# does, and its fastest time is kept, which is the least noisy measure of
+# what the code itself costs.
+#
+# The real boards also have a startup time: the time a new interpreter takes
+# to import pins.py and load the board, less the time a bare interpreter
+# takes to start, which is what every make target that runs pins.py pays.
+
+STAGES = ("load", "resolve", "format", "output", "verify")
+
+DEFAULT_STARTUP_REPEAT = 10
+
+# A stage has regressed when it is both this many times slower than the
+# baseline and slower by more than MIN_REGRESSION_MS, so that noise in the
+# very fast stages isn't reported.
+DEFAULT_THRESHOLD = 1.5
+MIN_REGRESSION_MS = 0.05
+
+DEFAULT_REPEAT = 50
+
+# synthetic boards: a stack of passthrough boards that each use a couple of
+# pins, with a board on top that aliases every pin many times over
+SYNTHETIC_STACK_DEPTH = 40
+SYNTHETIC_ALIAS_GROUPS = 256
+
+
+def default_baseline_path():
+    return os.path.join(pins.cache_root(), "pins_bench.json")
+
+
+# A benchmark case: a variant to generate, and the boards that need to be
+# registered with pins.py to generate it.
+def real_case(board_name):
+    pin_config = pins.boards[board_name]
+    return pins.Variant(board_name, pins.board_sides(pin_config)), {}
+
+
+def synthetic_module(name, groups, passthrough, optional_pins=False):
+    module = types.ModuleType(name)
+    module.breakouts = ((groups, []),)
+    module.passthrough = passthrough
+    module.optional_pins = optional_pins
+    return module
+
+
+def synthetic_case():
+    base_pins = list(pins.base_pin_numbers)
+    modules = {}
+    stack = []
+    for i in range(SYNTHETIC_STACK_DEPTH):
+        name = f"synthetic-{i}"
+        groups = [(f"SYNTHETIC_{i}", base_pins[2 * i : 2 * i + 2])]
+        modules[name] = synthetic_module(f"bench.synthetic_{i}", groups, True)
+        stack.append(name)
+
+    groups = [
+        (f"ALIAS_{i}", base_pins[(8 * i) % len(base_pins) :][:8])
+        for i in range(SYNTHETIC_ALIAS_GROUPS)
+    ]
+    modules["synthetic-aliases"] = synthetic_module(
+        "bench.synthetic_aliases", groups, False, optional_pins=True
+    )
+    stack.append("synthetic-aliases")
+    return pins.Variant("hx8k", ("L",), (tuple(stack),)), modules
+
+
+def register(modules):
+    for name, module in modules.items():
+        sys.modules[module.__name__] = module
+        pins.breakout_modules[name] = module.__name__
+
+
+def unregister(modules):
+    for name, module in modules.items():
+        del sys.modules[module.__name__]
+        del pins.breakout_modules[name]
+
+
+# Run each stage of generating variant once, returning the time of each.
+def run_stages(variant, output):
+    times = {}
+    pins.clear_caches()
+
+    start = time.perf_counter()
+    module = importlib.reload(importlib.import_module(f"boards.{variant.board}"))
+    pin_config = pins.board_config(module)
+    for name in pins.variant_breakouts(variant):
+        pins.load_breakout(name)
+    times["load"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for side in variant.sides:
+        pin_table = pins.side_pin_table(pin_config, side)
+        for _, grp in pins.peripheral_groups:
+            pins.peripheral_group_to_ice_group(grp, pin_table)
+    for stack in variant.stacks or ():
+        for depth in range(len(stack) + 1):
+            pins.stack_permutation(stack[:depth])
+    times["resolve"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    text = "".join(
+        pins.pcf_chunks(pins.gen_pcf(pin_config, variant.sides, variant.stacks))
+    )
+    times["format"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pins.atomic_write(output, [text])
+    times["output"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pins.verify_variant(variant)
+    times["verify"] = time.perf_counter() - start
+    return times
+
+
+# fastest time of each stage, in ms
+def bench_case(variant, modules, repeat, output):
+    register(modules)
+    gc.disable()
+    try:
+        best = {}
+        for _ in range(repeat):
+            for stage, t in run_stages(variant, output).items():
+                best[stage] = min(best.get(stage, t), t)
+    finally:
+        gc.enable()
+        unregister(modules)
+        pins.clear_caches()
+    return {stage: best[stage] * 1000 for stage in STAGES}
+
+
+# fastest time, in ms, for a new interpreter to run code
+def interpreter_time(code, repeat):
+    scripts_dir = os.path.dirname(os.path.abspath(pins.__file__))
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=scripts_dir, check=True)
+        t = time.perf_counter() - start
+        best = t if best is None else min(best, t)
+    return best * 1000
+
+
+def bench_startup(board_name, repeat):
+    bare = interpreter_time("pass", repeat)
+    code = f"import pins; pins.boards[{board_name!r}]"
+    return interpreter_time(code, repeat) - bare
+
+
+def bench(repeat, startup_repeat):
+    cases = {name: real_case(name) for name in pins.boards}
+    cases["synthetic"] = synthetic_case()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output = os.path.join(tmp_dir, "bench.pcf")
+        for name, (variant, modules) in cases.items():
+            results[name] = bench_case(variant, modules, repeat, output)
+    for name in pins.boards:
+        results[name]["startup"] = bench_startup(name, startup_repeat)
+    return results
+
+
+def read_baseline(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+# Print the results alongside the baseline, returning the stages that have
+# regressed.
+def report(results, baseline, threshold):
+    regressions = []
+    print(f"{'case':<12} {'stage':<8} {'ms':>9} {'baseline':>9} {'ratio':>6}")
+    for name, stages in results.items():
+        for stage, ms in stages.items():
+            base = (baseline or {}).get(name, {}).get(stage)
+            if base is None:
+                print(f"{name:<12} {stage:<8} {ms:9.3f}")
+                continue
+
+            ratio = ms / base if base else float("inf")
+            regressed = ms > base * threshold and ms - base > MIN_REGRESSION_MS
+            flag = "  REGRESSED" if regressed else ""
+            print(f"{name:<12} {stage:<8} {ms:9.3f} {base:9.3f} {ratio:6.2f}{flag}")
+            if regressed:
+                regressions.append(f"{name} {stage}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the stages of pins.py against a stored baseline."
+    )
+    parser.add_argument(
+        "--baseline",
+        default=default_baseline_path(),
+        help="baseline file (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--save",
+        action="store_true",
+        help="store the results as the new baseline",
+    )
+    parser.add_argument(
+        "-n",
+        "--repeat",
+        type=int,
+        default=DEFAULT_REPEAT,
+        help="times to run each stage, the fastest is kept (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--startup-repeat",
+        type=int,
+        default=DEFAULT_STARTUP_REPEAT,
+        help="times to start an interpreter for the startup time "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="slowdown, relative to the baseline, that fails a stage "
+        "(default: %(default)s)",
+    )
+    args = parser.parse_args()
+
+    results = bench(args.repeat, args.startup_repeat)
+    baseline = read_baseline(args.baseline)
+    regressions = report(results, baseline, args.threshold)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        pins.atomic_write(args.baseline, [json.dumps(results, indent=2) + "\n"])
+        print(f"baseline saved to {args.baseline}")
+    elif baseline is None:
+        print(f"no baseline at {args.baseline}, use --save to store one")
+
+    if regressions and not args.save:
+        print(f"error: regressed: {', '.join(regressions)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+
+import argparse
+import importlib
+import sys
+
+import pcbdb
+import pins
+
+# This script searches for a shorter routing of the sram breakouts' buses.
+#
+# The bits of an sram's address and data buses are interchangeable, so each
+# bus can be wired to its set of connector pins in any order. The order in
+# breakouts/ is whatever the board was first routed with. Here the length of
+# each bit's trace is estimated for every pin it could use, as the manhattan
+# distance between the pads in the KiCad layout, and the bits are assigned to
+# pins so that the longest trace is as short as possible, and then so that
+# the total length is as short as possible.
+#
+# The result is a set of new group tables, which only become valid once the
+# breakout is rerouted to match them. Each bus keeps its set of pins, so the
+# boards that can be stacked with the breakout are unchanged.
+
+DEFAULT_BREAKOUTS = ["sram", "sram-256x2"]
+
+
+def manhattan(a, b):
+    return abs(a.x - b.x) + abs(a.y - b.y)
+
+
+# A bus of a breakout: its label, the base group pins it is on and the pad of
+# each of its bits on the device.
+def breakout_buses(db, module):
+    components = pcbdb.load_components(db, pcbdb.source_project(module.kicad_source))
+    plug = components[module.kicad_plug]
+
+    buses = []
+    for groups, _ in module.breakouts:
+        for label, grp in groups:
+            spec = module.kicad_pins.get(label, "")
+            if "{}" not in spec or ":" not in spec:
+                continue
+            ref, function = spec.split(":", 1)
+            by_function = {p.function: p for p in components[ref].values()}
+            pads = [by_function[function.format(i)] for i in range(len(grp))]
+            buses.append((label, grp, pads))
+    return buses, plug
+
+
+# The length of the trace on the core board from each connector pin of a side
+# to the ice40, which is added to the breakout's traces when the core board
+# has a layout.
+def core_board_lengths(db, board_name, side):
+    board = importlib.import_module(f"boards.{board_name}")
+    if not board.kicad_source.endswith(".kicad_pcb"):
+        raise ValueError(f"{board_name} has no layout, only a schematic")
+    if side not in board.kicad_connectors:
+        raise ValueError(f"{board_name} has no {side} connector")
+
+    components = pcbdb.load_components(db, pcbdb.source_project(board.kicad_source))
+    connector = components[board.kicad_connectors[side]]
+    fpga = components[board.kicad_fpga]
+    io_dict = board.left_pin_to_logical if side == "L" else board.right_pin_to_logical
+
+    lengths = {}
+    for name, pin in pins.base_pin_numbers.items():
+        core_pin = pins.b2b_pin_to_pin(pin)
+        ball = board.logical_pin_to_phys[io_dict[core_pin]]
+        lengths[name] = manhattan(connector[str(core_pin)], fpga[ball])
+    return lengths
+
+
+# cost[bit][pin] is the estimated length of the trace for bit on grp's pin
+def bus_costs(grp, pads, plug, core_lengths):
+    return [
+        [
+            manhattan(pad, plug[str(pins.base_pin_numbers[name])])
+            + core_lengths.get(name, 0.0)
+            for name in grp
+        ]
+        for pad in pads
+    ]
+
+
+# Whether each row can be given its own column out of those in allowed[row].
+def has_perfect_matching(allowed):
+    match = {}
+
+    def augment(row, seen):
+        for col in allowed[row]:
+            if col not in seen:
+                seen.add(col)
+                if col not in match or augment(match[col], seen):
+                    match[col] = row
+                    return True
+        return False
+
+    return all(augment(row, set()) for row in range(len(allowed)))
+
+
+# The assignment of rows to columns of a square cost matrix with the least
+# total cost, as the column of each row. This is the Hungarian algorithm,
+# with row and column potentials, in O(n^3).
+def min_cost_assignment(cost):
+    n = len(cost)
+    inf = float("inf")
+    u = [0.0] * (n + 1)
+    v = [0.0] * (n + 1)
+    row_of = [0] * (n + 1)
+    way = [0] * (n + 1)
+    for row in range(1, n + 1):
+        row_of[0] = row
+        col0 = 0
+        min_slack = [inf] * (n + 1)
+        used = [False] * (n + 1)
+        while True:
+            used[col0] = True
+            row0 = row_of[col0]
+            delta = inf
+            col1 = 0
+            for col in range(1, n + 1):
+                if not used[col]:
+                    slack = cost[row0 - 1][col - 1] - u[row0] - v[col]
+                    if slack < min_slack[col]:
+                        min_slack[col] = slack
+                        way[col] = col0
+                    if min_slack[col] < delta:
+                        delta = min_slack[col]
+                        col1 = col
+            for col in range(n + 1):
+                if used[col]:
+                    u[row_of[col]] += delta
+                    v[col] -= delta
+                else:
+                    min_slack[col] -= delta
+            col0 = col1
+            if row_of[col0] == 0:
+                break
+        while col0:
+            col1 = way[col0]
+            row_of[col0] = row_of[col1]
+            col0 = col1
+
+    assignment = [0] * n
+    for col in range(1, n + 1):
+        assignment[row_of[col] - 1] = col - 1
+    return assignment
+
+
+# The assignment whose longest trace is shortest, found by a binary search
+# over the costs for the smallest limit that still leaves every bit a pin,
+# and among those the one with the least total length.
+def optimize_bus(cost):
+    limits = sorted({c for row in cost for c in row})
+    lo, hi = 0, len(limits) - 1
+    while lo < hi:
+        mid = (lo + hi) // 2
+        allowed = [
+            [col for col, c in enumerate(row) if c <= limits[mid]] for row in cost
+        ]
+        if has_perfect_matching(allowed):
+            hi = mid
+        else:
+            lo = mid + 1
+
+    limit = limits[lo]
+    penalty = limits[-1] * len(cost) + 1
+    return min_cost_assignment(
+        [[c if c <= limit else penalty for c in row] for row in cost]
+    )
+
+
+def assignment_lengths(cost, assignment):
+    return [cost[bit][col] for bit, col in enumerate(assignment)]
+
+
+def describe_lengths(lengths):
+    return (
+        f"total {sum(lengths):7.2f} mm, longest {max(lengths):6.2f} mm, "
+        f"skew {max(lengths) - min(lengths):6.2f} mm"
+    )
+
+
+# The name a module gives the table of groups, e.g. sram_groups.
+def groups_variable(module, groups):
+    for name, value in vars(module).items():
+        if value is groups:
+            return name
+    raise ValueError(f"{module.__name__} has no variable for its groups")
+
+
+# Format a table of groups the way the breakout modules lay them out.
+def format_groups(variable, groups):
+    lines = [f"{variable} = ["]
+    for label, grp in groups:
+        lines += ["    (", f'        "{label}",', "        ["]
+        lines += [f'            "{name}",' for name in grp]
+        lines += ["        ],", "    ),"]
+    lines.append("]")
+    return "\n".join(lines)
+
+
+def optimize_breakout(db, name, core_lengths):
+    module = importlib.import_module(pins.breakout_modules[name])
+    if not hasattr(module, "kicad_source"):
+        raise ValueError(f"{name} has no KiCad design to optimize against")
+
+    buses, plug = breakout_buses(db, module)
+    optimized = {}
+    for label, grp, pads in buses:
+        cost = bus_costs(grp, pads, plug, core_lengths)
+        current = list(range(len(grp)))
+        assignment = optimize_bus(cost)
+        optimized[label] = [grp[col] for col in assignment]
+
+        print(f"{name} {label} ({len(grp)} bits)")
+        print(f"  current:   {describe_lengths(assignment_lengths(cost, current))}")
+        print(f"  optimized: {describe_lengths(assignment_lengths(cost, assignment))}")
+        for bit, col in enumerate(assignment):
+            if col != bit:
+                print(
+                    f"    bit {bit:2}: {grp[bit]:<5} -> {grp[col]:<5} "
+                    f"{cost[bit][bit]:6.2f} -> {cost[bit][col]:6.2f} mm"
+                )
+
+    tables = []
+    for groups, _ in module.breakouts:
+        new_groups = [(label, optimized.get(label, grp)) for label, grp in groups]
+        tables.append(format_groups(groups_variable(module, groups), new_groups))
+    return module, tables
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Search for shorter bit orders for the sram breakouts' buses."
+    )
+    parser.add_argument(
+        "breakouts",
+        nargs="*",
+        default=DEFAULT_BREAKOUTS,
+        help="breakouts to optimize (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--board",
+        choices=pins.boards,
+        help="include the traces on this core board, which needs a layout",
+    )
+    parser.add_argument(
+        "--side",
+        choices=pins.SIDES,
+        default="R",
+        help="connector the breakout is fitted to on --board (default: %(default)s)",
+    )
+    parser.add_argument("--db", help="design database, see pcbdb.py")
+    args = parser.parse_args()
+
+    for name in args.breakouts:
+        if name not in pins.breakout_modules:
+            parser.error(f"unknown board '{name}'")
+
+    try:
+        db = pcbdb.connect(args.db)
+        core_lengths = {}
+        if args.board:
+            core_lengths = core_board_lengths(db, args.board, args.side)
+
+        results = [optimize_breakout(db, name, core_lengths) for name in args.breakouts]
+    except (OSError, ValueError, KeyError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    for module, tables in results:
+        path = module.__name__.replace(".", "/") + ".py"
+        print(f"\n# {path}, once the board is rerouted to match")
+        for table in tables:
+            print(table)
+
+
+if __name__ == "__main__":
+    main()
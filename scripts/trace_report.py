@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+
+import argparse
+import importlib
+import sys
+
+import pcbdb
+import pins
+
+# This script reports the routed length of each bit of the buses in pins.py,
+# e.g. SRAM_DATA_BUS or ADC_X, from the tracks in the KiCad layouts, and the
+# skew within each bus as a length and as a propagation delay.
+#
+# A bit's length on a board is the length of the tracks of the net on the
+# connector pin it uses, plus the board's thickness for each via, which is
+# the most a via can add. Nets that end at a component, e.g. a series
+# resistor, are only measured up to it. With --board, the core board's part
+# of each breakout bit is added to the breakout's, giving the whole route
+# from the ice40 to the device.
+
+# propagation delay of an outer layer trace on FR-4, whose effective
+# dielectric constant is about 3.2
+DEFAULT_PS_PER_MM = 6.0
+
+
+# A board's components and routes, see pcbdb.
+def load_board(db, kicad_source):
+    project = pcbdb.source_project(kicad_source)
+    return pcbdb.load_components(db, project), pcbdb.load_routes(db, project)
+
+
+# A leg of a bit's route on one board: the net on the connector pin, its
+# route (None if it isn't routed) and the board's thickness.
+def board_leg(board_routes, connector, pin):
+    routes, thickness = board_routes
+    net = connector[str(pin)].net
+    return net, routes.get(net), thickness
+
+
+def leg_length(leg):
+    _, route, thickness = leg
+    if route is None:
+        return 0.0
+    return route.length + route.vias * thickness
+
+
+# Buses of a core board: the peripheral groups on each side's connector, as
+# (name, bits) where each bit is (name, legs).
+def core_board_buses(db, board):
+    components, routes = load_board(db, board.kicad_source)
+    buses = []
+    for side, ref in board.kicad_connectors.items():
+        connector = components[ref]
+        for label, grp in pins.peripheral_groups:
+            bits = [
+                (
+                    f"{label}[{i}]",
+                    [board_leg(routes, connector, pins.b2b_pin_to_pin(p))],
+                )
+                for i, p in enumerate(grp)
+            ]
+            buses.append((f"{side}_{label}", bits))
+    return buses
+
+
+# The legs on the core board for each base group pin, e.g. A[0], of a side.
+def core_board_legs(db, board, side):
+    components, routes = load_board(db, board.kicad_source)
+    connector = components[board.kicad_connectors[side]]
+    return {
+        name: board_leg(routes, connector, pins.b2b_pin_to_pin(p))
+        for name, p in pins.base_pin_numbers.items()
+    }
+
+
+# Buses of a breakout, its groups and its signals, in the same form as
+# core_board_buses. With core_legs each bit starts on the core board.
+def breakout_buses(db, module, core_legs=None):
+    components, routes = load_board(db, module.kicad_source)
+    plug = components[module.kicad_plug]
+
+    def legs(name):
+        leg = board_leg(routes, plug, pins.base_pin_numbers[name])
+        return ([core_legs[name]] if core_legs else []) + [leg]
+
+    buses = []
+    for groups, signals in module.breakouts:
+        for label, grp in groups:
+            buses.append(
+                (label, [(f"{label}[{i}]", legs(name)) for i, name in enumerate(grp)])
+            )
+        for label, name in signals:
+            buses.append((label, [(label, legs(name))]))
+    return buses
+
+
+def report_buses(title, buses, ps_per_mm, show_bits):
+    print(title)
+    width = max(len(name) for name, _ in buses)
+    for name, bits in buses:
+        lengths = [sum(leg_length(leg) for leg in legs) for _, legs in bits]
+        unrouted = sum(
+            1 for _, legs in bits if any(route is None for _, route, _ in legs)
+        )
+        skew = max(lengths) - min(lengths)
+        line = (
+            f"  {name:<{width}} {len(bits):3} bits "
+            f"{min(lengths):7.2f} - {max(lengths):7.2f} mm  "
+            f"skew {skew:6.2f} mm {skew * ps_per_mm:6.0f} ps  "
+            f"max delay {max(lengths) * ps_per_mm:6.0f} ps"
+        )
+        if unrouted:
+            line += f"  ({unrouted} unrouted)"
+        print(line)
+
+        if show_bits:
+            for (bit, legs), length in zip(bits, lengths):
+                nets = " + ".join(str(net) for net, _, _ in legs)
+                vias = sum(route.vias for _, route, _ in legs if route)
+                print(
+                    f"    {bit:<24} {length:7.2f} mm {vias:2} vias "
+                    f"{length * ps_per_mm:6.0f} ps  {nets}"
+                )
+
+
+def has_layout(module):
+    return getattr(module, "kicad_source", "").endswith(".kicad_pcb")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Report the routed length and skew of the buses' traces."
+    )
+    parser.add_argument(
+        "names",
+        nargs="*",
+        help="core boards and breakouts to report on (default: all of them "
+        "that have a layout)",
+    )
+    parser.add_argument(
+        "--board",
+        choices=pins.boards,
+        help="add this core board's traces to each breakout's",
+    )
+    parser.add_argument(
+        "--side",
+        choices=pins.SIDES,
+        default="R",
+        help="connector the breakouts are fitted to on --board "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--ps-per-mm",
+        type=float,
+        default=DEFAULT_PS_PER_MM,
+        help="propagation delay of the traces (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--bits", action="store_true", help="also list the length of every bit"
+    )
+    parser.add_argument("--db", help="design database, see pcbdb.py")
+    args = parser.parse_args()
+
+    modules = {name: importlib.import_module(f"boards.{name}") for name in pins.boards}
+    modules.update(
+        (name, importlib.import_module(module_name))
+        for name, module_name in pins.breakout_modules.items()
+    )
+    names = args.names or [
+        name for name, module in modules.items() if has_layout(module)
+    ]
+    for name in names + ([args.board] if args.board else []):
+        if name not in modules:
+            parser.error(f"unknown board '{name}'")
+        if not has_layout(modules[name]):
+            parser.error(f"{name} has no layout to measure")
+
+    core_board = modules.get(args.board)
+    if core_board and args.side not in core_board.kicad_connectors:
+        parser.error(f"{args.board} has no {args.side} connector")
+
+    try:
+        db = pcbdb.connect(args.db)
+        core_legs = None
+        if core_board:
+            core_legs = core_board_legs(db, core_board, args.side)
+
+        for name in names:
+            module = modules[name]
+            title = f"{name} ({module.kicad_source})"
+            if name in pins.boards:
+                buses = core_board_buses(db, module)
+            else:
+                buses = breakout_buses(db, module, core_legs)
+                if core_board:
+                    title += f" on {args.board} {args.side}"
+            if buses:
+                report_buses(title, buses, args.ps_per_mm, args.bits)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+
+# Waiting for the files in a set of directories to change, with inotify on
+# linux and by polling the files' mtimes elsewhere.
+#
+# A watcher's changes() yields the set of paths that changed each time any
+# do. Editors save in different ways, e.g. writing the file in place or
+# writing a new file and renaming it over the old one, so both are watched
+# for. Events that arrive within DEBOUNCE seconds of each other are
+# reported together, so that a save is reported once.
+
+DEBOUNCE = 0.05
+
+DEFAULT_POLL_INTERVAL = 0.5
+
+# from sys/inotify.h
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_CLOEXEC = os.O_CLOEXEC
+
+# struct inotify_event, followed by its name
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+class InotifyWatcher:
+    def __init__(self, directories):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_init1: {os.strerror(errno)}")
+
+        self.directories = {}
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+        for directory in directories:
+            wd = libc.inotify_add_watch(self.fd, os.fsencode(directory), mask)
+            if wd < 0:
+                errno = ctypes.get_errno()
+                self.close()
+                raise OSError(errno, os.strerror(errno), directory)
+            self.directories[wd] = directory
+
+    def read_events(self):
+        buf = os.read(self.fd, 64 * 1024)
+        paths = set()
+        offset = 0
+        while offset < len(buf):
+            wd, _, _, length = INOTIFY_EVENT.unpack_from(buf, offset)
+            offset += INOTIFY_EVENT.size
+            name = buf[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if wd in self.directories and name:
+                paths.add(os.path.join(self.directories[wd], os.fsdecode(name)))
+        return paths
+
+    def changes(self):
+        while True:
+            paths = self.read_events()
+            while select.select([self.fd], [], [], DEBOUNCE)[0]:
+                paths |= self.read_events()
+            if paths:
+                yield paths
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    def __init__(self, directories, interval=DEFAULT_POLL_INTERVAL):
+        self.directories = list(directories)
+        self.interval = interval
+
+    def snapshot(self):
+        files = {}
+        for directory in self.directories:
+            for entry in os.scandir(directory):
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files[entry.path] = (st.st_mtime_ns, st.st_size)
+        return files
+
+    def changes(self):
+        files = self.snapshot()
+        while True:
+            time.sleep(self.interval)
+            current = self.snapshot()
+            paths = {
+                path
+                for path in files.keys() | current.keys()
+                if files.get(path) != current.get(path)
+            }
+            files = current
+            if paths:
+                yield paths
+
+    def close(self):
+        pass
+
+
+# An inotify watcher if the platform has inotify, otherwise a polling one.
+def open_watcher(directories, interval=DEFAULT_POLL_INTERVAL):
+    try:
+        return InotifyWatcher(directories)
+    except (OSError, AttributeError, TypeError):
+        return PollingWatcher(directories, interval)